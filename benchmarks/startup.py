@@ -0,0 +1,63 @@
+# ruff: noqa: INP001
+"""Startup benchmark: fail if importing the CLI or printing `jz --help` is slower than the targets.
+
+Run with `uv run python benchmarks/startup.py`. Timings are the best of `--repeat` fresh interpreters.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def best_time(code: str, repeat: int, env: dict[str, str]) -> float:
+    """Return the fastest wall-clock time, in milliseconds, of running `code` in a new interpreter."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, env=env)  # noqa: S603
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main(
+    repeat: int = typer.Option(10, help="Interpreters started per measurement."),
+    import_target: float = typer.Option(150.0, help="Maximum time (ms) to import `jz_cli.main`."),
+    help_target: float = typer.Option(350.0, help="Maximum time (ms) to print `jz --help`."),
+) -> None:
+    """Measure `import jz_cli.main` and `jz --help` against their targets."""
+    with tempfile.TemporaryDirectory() as config_home:
+        # An empty config dir, so that nothing is read from (or written to) the user's configuration
+        env = {**os.environ, "PYTHONPATH": str(ROOT), "XDG_CONFIG_HOME": config_home}
+        measurements = {
+            "interpreter": (best_time("pass", repeat, env), None),
+            "import jz_cli.main": (best_time("import jz_cli.main", repeat, env), import_target),
+            "jz --help": (
+                best_time("import sys; from jz_cli.main import app; sys.argv = ['jz', '--help']; app()", repeat, env),
+                help_target,
+            ),
+        }
+
+    failed = False
+    for name, (elapsed, target) in measurements.items():
+        if target is None:
+            typer.echo(f"   {name}: {elapsed:.0f} ms")
+        elif elapsed > target:
+            failed = True
+            typer.echo(f"❌ {name}: {elapsed:.0f} ms (target {target:.0f} ms)")
+        else:
+            typer.echo(f"✅ {name}: {elapsed:.0f} ms (target {target:.0f} ms)")
+    if failed:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,189 @@
+"""Persistent remote command agent reached over the SSH master connection."""
+
+from __future__ import annotations
+
+import json
+import shlex
+import subprocess
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Runs on the login node. Kept compatible with the system python3 there (3.6+): one JSON frame per line in, one
+# JSON frame per line out. Commands never see the agent's stdin, so they cannot swallow the request stream.
+# Streaming requests get one {"stream", "data"} frame per output line before the final frame with the exit code.
+_AGENT_SOURCE = r"""
+import json, os, subprocess, sys, threading
+
+lock = threading.Lock()
+
+def send(frame):
+    with lock:
+        sys.stdout.write(json.dumps(frame) + "\n")
+        sys.stdout.flush()
+
+def pump(req_id, name, pipe):
+    for raw in iter(pipe.readline, b""):
+        send({"id": req_id, "stream": name, "data": raw.decode("utf-8", "replace")})
+
+shell = os.environ.get("SHELL") or "/bin/sh"
+send({"ready": True})
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    req = json.loads(line)
+    env = None
+    if req.get("env"):
+        env = dict(os.environ)
+        env.update(req["env"])
+    out, err = b"", b""
+    try:
+        proc = subprocess.Popen(
+            [shell, "-c", req["cmd"]],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=req.get("cwd") or None,
+            env=env,
+        )
+        if req.get("stream"):
+            pumps = [threading.Thread(target=pump, args=(req["id"], n, p)) for n, p in
+                     (("stdout", proc.stdout), ("stderr", proc.stderr))]
+            for t in pumps:
+                t.start()
+            for t in pumps:
+                t.join()
+            code = proc.wait()
+        else:
+            out, err = proc.communicate()
+            code = proc.returncode
+    except OSError as exc:
+        err, code = str(exc).encode(), 127
+    send({
+        "id": req["id"],
+        "stdout": out.decode("utf-8", "replace"),
+        "stderr": err.decode("utf-8", "replace"),
+        "returncode": code,
+    })
+"""
+_MAX_BANNER_LINES = 200
+
+
+class AgentError(RuntimeError):
+    """Raised when the remote agent dies or answers with a malformed frame."""
+
+
+class RemoteAgent:
+    """Long-lived helper process on the remote host that executes framed command requests.
+
+    The agent is started once over the ControlMaster socket; every request afterwards reuses the same SSH channel,
+    so neither a local ``ssh`` process nor a remote login is paid per command.
+    """
+
+    def __init__(self, ssh_cmd: list[str]) -> None:
+        self.ssh_cmd = ssh_cmd
+        self._proc: subprocess.Popen | None = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @property
+    def alive(self) -> bool:
+        """Whether the agent process is running."""
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self) -> None:
+        """Start the agent and wait for its ready frame."""
+        if self.alive:
+            return
+        remote_cmd = f"python3 -u -c {shlex.quote(_AGENT_SOURCE)}"
+        self._proc = subprocess.Popen(  # noqa: S603
+            [*self.ssh_cmd, remote_cmd],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        # Shell start-up files may print banners before the agent runs; skip anything that is not a frame.
+        for _ in range(_MAX_BANNER_LINES):
+            line = self._proc.stdout.readline()
+            if not line:
+                break
+            try:
+                if json.loads(line).get("ready"):
+                    return
+            except (json.JSONDecodeError, AttributeError):
+                continue
+        self.close()
+        msg = "Remote agent did not report ready."
+        raise AgentError(msg)
+
+    def request(
+        self, cmd: str, cwd: str | None = None, env: dict[str, str] | None = None
+    ) -> subprocess.CompletedProcess:
+        """Run ``cmd`` through the agent and return its result."""
+        with self._lock:
+            reply = self._send(cmd, cwd, env, stream=False)
+        return subprocess.CompletedProcess(cmd, reply["returncode"], reply["stdout"], reply["stderr"])
+
+    def stream(self, cmd: str, cwd: str | None = None, env: dict[str, str] | None = None) -> Iterator[tuple[str, str]]:
+        """Run ``cmd`` through the agent, yielding ``(stream, line)`` pairs as they arrive.
+
+        Raises `subprocess.CalledProcessError` at the end if the command failed.
+        """
+        with self._lock:
+            reply = self._send(cmd, cwd, env, stream=True)
+            try:
+                while "stream" in reply:
+                    yield reply["stream"], reply["data"].rstrip("\n")
+                    reply = self._read_reply()
+            except GeneratorExit:
+                # The remaining frames cannot be skipped reliably; drop the agent, it is restarted on next use.
+                self.close()
+                raise
+        if reply["returncode"] != 0:
+            raise subprocess.CalledProcessError(reply["returncode"], cmd)
+
+    def _send(self, cmd: str, cwd: str | None, env: dict[str, str] | None, stream: bool) -> dict:
+        if not self.alive:
+            self.start()
+        self._next_id += 1
+        frame = {"id": self._next_id, "cmd": cmd, "cwd": cwd, "env": env, "stream": stream}
+        try:
+            self._proc.stdin.write(json.dumps(frame) + "\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            msg = "Remote agent connection lost."
+            raise AgentError(msg) from exc
+        return self._read_reply()
+
+    def _read_reply(self) -> dict:
+        reply = self._read_frame()
+        if reply.get("id") != self._next_id:
+            msg = f"Unexpected reply from remote agent: {reply!r}"
+            raise AgentError(msg)
+        return reply
+
+    def close(self) -> None:
+        """Stop the agent by closing its input stream."""
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._proc.kill()
+        self._proc = None
+
+    def _read_frame(self) -> dict:
+        line = self._proc.stdout.readline()
+        if not line:
+            msg = "Remote agent exited unexpectedly."
+            raise AgentError(msg)
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as exc:
+            msg = f"Malformed frame from remote agent: {line!r}"
+            raise AgentError(msg) from exc
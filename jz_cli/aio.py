@@ -0,0 +1,151 @@
+"""Asyncio API running many remote commands concurrently over the SSH master connection."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .ssh import (
+    CommandResult,
+    _login_shell_command,
+    get_env_snapshot,
+    get_remote_user,
+    get_ssh_opts,
+    start_master_connection,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+# OpenSSH multiplexes at most `MaxSessions` (10 by default) channels over one master connection
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+@dataclass
+class TimedResult(CommandResult):
+    """Outcome of one remote command run by a `RemoteSession`, with its wall-clock duration."""
+
+    elapsed: float = 0.0
+
+
+class RemoteSession:
+    """Concurrent remote command runner sharing the `jz ssh` ControlMaster socket and configuration.
+
+    Every command gets its own multiplexed channel; at most `max_concurrency` run at once and the others wait their
+    turn. Timeouts and task cancellation kill the command's channel.
+
+    ```python
+    async with RemoteSession(login_shell=True) as remote:
+        results = await remote.run_many([f"squeue -h -j {job_id} -o %T" for job_id in job_ids], timeout=30)
+    ```
+    """
+
+    def __init__(
+        self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, login_shell: bool = False, timeout: float | None = None
+    ) -> None:
+        self.login_shell = login_shell
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._semaphore: asyncio.Semaphore | None = None
+        self._ssh_cmd: list[str] | None = None
+        self._connecting: asyncio.Future | None = None
+        self._procs: set[asyncio.subprocess.Process] = set()
+
+    async def __aenter__(self) -> RemoteSession:  # noqa: PYI034
+        """Connect and return the session."""
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        """Kill the commands still running."""
+        await self.close()
+
+    async def connect(self) -> None:
+        """Make sure the master connection (and, for login-shell commands, the environment snapshot) exists.
+
+        Concurrent callers share a single connection attempt; a failed attempt is retried by the next call.
+        """
+        connecting = self._connecting
+        if connecting is None:
+            connecting = self._connecting = asyncio.ensure_future(self._connect())
+        try:
+            # Shielded so that cancelling one waiting command does not abort the attempt the others wait on
+            await asyncio.shield(connecting)
+        except Exception:
+            if self._connecting is connecting:
+                self._connecting = None
+            raise
+
+    async def _connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Both may block on a round trip; keep them off the event loop
+        await loop.run_in_executor(None, start_master_connection)
+        if self.login_shell:
+            await loop.run_in_executor(None, get_env_snapshot)
+        self._ssh_cmd = ["ssh", *get_ssh_opts().split(), get_remote_user()]
+        # Created here rather than in __init__ so that it belongs to the running event loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self) -> None:
+        """Kill the commands still running."""
+        for proc in list(self._procs):
+            _kill(proc)
+        for proc in list(self._procs):
+            await proc.wait()
+
+    async def run(self, cmd: str, login_shell: bool | None = None, timeout: float | None = None) -> TimedResult:
+        """Run `cmd` on jz and return its result.
+
+        Raises `asyncio.TimeoutError` after `timeout` seconds (session default if None), once the command is killed.
+        The timeout starts when the command does, not while it waits for a free slot.
+        """
+        await self.connect()
+        login_shell = self.login_shell if login_shell is None else login_shell
+        remote_cmd = _login_shell_command(cmd) if login_shell else cmd
+        timeout = self.timeout if timeout is None else timeout
+        async with self._semaphore:
+            start = time.monotonic()
+            proc = await asyncio.create_subprocess_exec(
+                *self._ssh_cmd,
+                remote_cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            self._procs.add(proc)
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            except BaseException:
+                # Timeout or cancellation: closing the channel stops the remote command
+                _kill(proc)
+                await proc.wait()
+                raise
+            finally:
+                self._procs.discard(proc)
+        return TimedResult(
+            cmd,
+            stdout.decode(errors="replace"),
+            stderr.decode(errors="replace"),
+            proc.returncode,
+            elapsed=time.monotonic() - start,
+        )
+
+    async def run_many(
+        self, cmds: Iterable[str], login_shell: bool | None = None, timeout: float | None = None
+    ) -> list[TimedResult | BaseException]:
+        """Run `cmds` concurrently; each entry is the command's result, or the exception (e.g. timeout) it raised."""
+        return await asyncio.gather(
+            *(self.run(cmd, login_shell=login_shell, timeout=timeout) for cmd in cmds), return_exceptions=True
+        )
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is None:
+        with contextlib.suppress(ProcessLookupError):
+            proc.kill()
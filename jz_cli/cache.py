@@ -0,0 +1,58 @@
+"""Small on-disk cache for data fetched from the cluster."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import typer
+
+APP_NAME = "jz"
+CACHE_DIR = "cache"
+
+
+def _cache_path(name: str) -> Path:
+    return Path(typer.get_app_dir(APP_NAME)) / CACHE_DIR / f"{name}.json"
+
+
+def load(name: str, ttl: float | None = None) -> Any | None:
+    """Return the cached value for `name`, or None if missing or older than `ttl` seconds."""
+    path = _cache_path(name)
+    try:
+        entry = json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if ttl is not None and time.time() - entry.get("timestamp", 0) > ttl:
+        return None
+    return entry.get("data")
+
+
+def age(name: str) -> float | None:
+    """Return the age in seconds of the cached value for `name`, or None if missing."""
+    try:
+        entry = json.loads(_cache_path(name).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return time.time() - entry.get("timestamp", 0)
+
+
+def store(name: str, data: Any, timestamp: float | None = None) -> None:
+    """Cache `data` under `name`, replacing the file atomically.
+
+    `timestamp` defaults to now; pass the original one to update an entry without extending its lifetime.
+    """
+    path = _cache_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{name}.")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"timestamp": time.time() if timestamp is None else timestamp, "data": data}, f)
+    Path(tmp).replace(path)
+
+
+def invalidate(name: str) -> None:
+    """Remove the cached value for `name`."""
+    _cache_path(name).unlink(missing_ok=True)
@@ -1,36 +1,112 @@
 """Configuration management for jz_cli."""
 
+from __future__ import annotations
+
+import fcntl
 import json
+import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
-from rich import box
-from rich.console import Console
-from rich.table import Table
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 APP_NAME = "jz"
 CONFIG_FILE = "config.json"
+PROFILES_KEY = "profiles"
+PROFILE_ENV = "JZ_CONFIG_PROFILE"
+
+# The parsed config file, loaded once per process, and the active profile (None for the top-level values)
+_config: dict | None = None
+_profile: str | None = os.environ.get(PROFILE_ENV) or None
+_app_dir_created = False
 
 
 def _config_path() -> Path:
+    return Path(typer.get_app_dir(APP_NAME)) / CONFIG_FILE
+
+
+def get_app_dir() -> Path:
+    """Return the jz app dir, creating it on the first call of the process."""
+    global _app_dir_created  # noqa: PLW0603
     app_dir = Path(typer.get_app_dir(APP_NAME))
-    app_dir.mkdir(parents=True, exist_ok=True)
-    return app_dir / CONFIG_FILE
+    if not _app_dir_created:
+        app_dir.mkdir(parents=True, exist_ok=True)
+        _app_dir_created = True
+    return app_dir
 
 
-def get_config() -> dict:
-    """Load the configuration from file."""
-    path = _config_path()
-    if path.exists():
-        with path.open() as f:
+def _read_config() -> dict:
+    try:
+        with _config_path().open() as f:
             return json.load(f)
-    return {}
+    except FileNotFoundError:
+        return {}
+
+
+def _load() -> dict:
+    global _config  # noqa: PLW0603
+    if _config is None:
+        _config = _read_config()
+    return _config
+
+
+@contextmanager
+def _locked_config() -> Iterator[dict]:
+    """Yield the config as currently on disk, holding the config lock, and write it back atomically on exit."""
+    global _config  # noqa: PLW0603
+    path = get_app_dir() / CONFIG_FILE
+    with path.with_suffix(".lock").open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # Re-read under the lock so that changes made by concurrent jz processes are not lost
+        config = _read_config()
+        yield config
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{CONFIG_FILE}.")
+        with os.fdopen(fd, "w") as f:
+            json.dump(config, f, indent=2)
+        Path(tmp).replace(path)
+    _config = config
+
+
+def get_profile() -> str | None:
+    """Return the name of the active profile, or None when the top-level values are used."""
+    return _profile
+
+
+def use_profile(name: str | None) -> None:
+    """Make `name` the active profile for the rest of the process (None for the top-level values)."""
+    global _profile  # noqa: PLW0603
+    _profile = name or None
+
+
+def list_profiles() -> list[str]:
+    """Return the names of the profiles defined in the config."""
+    return list(_load().get(PROFILES_KEY, {}))
+
+
+def get_config() -> dict:
+    """Return the configuration of the active profile: the top-level values, overridden by the profile's."""
+    config = {k: v for k, v in _load().items() if k != PROFILES_KEY}
+    if _profile is not None:
+        config.update(_load().get(PROFILES_KEY, {}).get(_profile, {}))
+    return config
 
 
 def save_config(config: dict) -> None:
-    """Save the configuration to file."""
-    with _config_path().open("w") as f:
-        json.dump(config, f, indent=2)
+    """Save `config` as the configuration of the active profile."""
+    with _locked_config() as current:
+        if _profile is None:
+            profiles = current.get(PROFILES_KEY)
+            current.clear()
+            current.update(config)
+            if profiles is not None:
+                current[PROFILES_KEY] = profiles
+        else:
+            current.setdefault(PROFILES_KEY, {})[_profile] = config
 
 
 def get_value(key: str) -> str:
@@ -39,18 +115,22 @@ def get_value(key: str) -> str:
 
 
 def set_value(key: str, username: str) -> None:
-    """Set a configuration value."""
-    config = get_config()
-    config[key] = username
-    save_config(config)
+    """Set a configuration value in the active profile."""
+    with _locked_config() as current:
+        target = current if _profile is None else current.setdefault(PROFILES_KEY, {}).setdefault(_profile, {})
+        target[key] = username
 
 
 def ensure_config() -> None:
-    """Ensure that a configuration file exists. If not, prompt the user to run setup."""
-    if not _config_path().exists():
+    """Ensure that a configuration (for the active profile) exists. If not, prompt the user to run setup."""
+    if not _load():
         typer.echo("🚧 No configuration found.")
         typer.echo("🛠  Please run `jz setup` to configure before using the CLI.")
         raise typer.Exit(code=1)
+    if _profile is not None and _profile not in list_profiles():
+        typer.echo(f"🚧 No configuration found for profile '{_profile}'.")
+        typer.echo(f"🛠  Please run `jz --config-profile {_profile} setup` to configure it.")
+        raise typer.Exit(code=1)
 
 
 app = typer.Typer(help="Inspect or modify jz configuration.")
@@ -59,6 +139,10 @@ app = typer.Typer(help="Inspect or modify jz configuration.")
 @app.command()
 def show() -> None:
     """Display the full current configuration."""
+    from rich import box  # noqa: PLC0415
+    from rich.console import Console  # noqa: PLC0415
+    from rich.table import Table  # noqa: PLC0415
+
     config = get_config()
     if not config:
         typer.echo("No configuration set yet.")
@@ -69,9 +153,26 @@ def show() -> None:
         table.add_row(k, str(v))
 
     console = Console()
+    if _profile is not None:
+        console.print(f"Profile: [bold]{_profile}[/bold]")
     console.print(table)
 
 
+@app.command()
+def profiles() -> None:
+    """List the named profiles (select one with `jz --config-profile NAME` or `JZ_CONFIG_PROFILE`)."""
+    names = list_profiles()
+    if not names:
+        typer.echo("No profiles defined; the top-level configuration is used.")
+        return
+    raw = _load()[PROFILES_KEY]
+    for name in names:
+        marker = "*" if name == _profile else " "
+        user = raw[name].get("remote_user") or _load().get("remote_user")
+        account = raw[name].get("account") or _load().get("account")
+        typer.echo(f"{marker} {name}: {user} ({account})")
+
+
 @app.command()
 def remote_user(
     value: str = typer.Option(None, "--set", help="Set remote_user. If not provided, just show it."),
@@ -92,3 +193,36 @@ def account(value: str = typer.Option(None, "--set", help="Set account. If not p
         typer.echo(f"✅ account set to '{value}'")
     else:
         typer.echo(f"👤 account: {get_value('account')}")
+
+
+@app.command()
+def session(
+    value: str = typer.Option(None, "--set", help="Set session (on/off). If not provided, just show it."),
+) -> None:
+    """Show or set whether remote commands share one persistent remote agent."""
+    if value:
+        if value.lower() not in ("on", "off"):
+            typer.echo("❌ session must be 'on' or 'off'.")
+            raise typer.Exit(1)
+        set_value("session", value.lower())
+        typer.echo(f"✅ session set to '{value.lower()}'")
+    else:
+        typer.echo(f"🔌 session: {get_value('session') or 'off'}")
+
+
+@app.command()
+def refresh_remote() -> None:
+    """Re-fetch the cached remote facts ($USER, $SCRATCH, $WORK, $STORE, rsync directories)."""
+    from rich import box  # noqa: PLC0415
+    from rich.console import Console  # noqa: PLC0415
+    from rich.table import Table  # noqa: PLC0415
+
+    from .remote import invalidate_remote_facts, refresh_remote_facts  # noqa: PLC0415
+
+    invalidate_remote_facts()
+    facts = refresh_remote_facts()
+    table = Table("Fact", "Value", box=box.MINIMAL)
+    for k, v in facts.items():
+        if k != "rsync_base_dirs":
+            table.add_row(k, v)
+    Console().print(table)
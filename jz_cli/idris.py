@@ -2,23 +2,314 @@
 
 from __future__ import annotations
 
+import json
+import re
+import shlex
+import sqlite3
+import subprocess
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
 import typer
+from rich import box
+from rich.console import Console
+from rich.table import Table
 
-from .ssh import run
+from . import cache
+from .config import get_app_dir, get_value
+from .remote import get_remote_fact
+from .ssh import get_remote_user, run, stream
 
 app = typer.Typer(help="IDRIS-specific commands.")
 
+DEFAULT_ACCOUNTING_TTL = 600
+DEFAULT_BURN_RATE_DAYS = 14
+HISTORY_FILE = "idris-history.sqlite3"
+DEFAULT_BREAKDOWN_WORKERS = 8
+DEFAULT_BREAKDOWN_TOP = 20
+_SHARDS_MARKER = "__JZ_SHARDS__"
+_SHARD_MARKER = "__JZ_SHARD__"
+_ENTRY_MARKER = "__JZ_ENTRY__"
+_SPACES = ("home", "work", "scratch", "store")
+
+# `idracct` prints, per project, one header per kind of hours followed by the consumption, e.g.
+# `Heures V100 (du 01-11-2023 au 31-10-2024)   Allocation : 5000 h.gpu` then `Consommation : 1234 h.gpu (24.68%)`.
+# Figures are only read after `Allocation :` / `Consommation :` and must carry an hour unit, so the digits of the
+# date range never count as hours.
+_PROJECT_RE = re.compile(r"^\W*proje(?:c)?t\b\s*:?\s*([A-Za-z0-9_-]+)", re.IGNORECASE)
+_RESOURCE_RE = re.compile(r"\b(?:CPU|GPU|[A-Z]\d{2,3})\b", re.IGNORECASE)
+_NUMBER = r"(\d+(?:[ ,]\d{3})*(?:\.\d+)?)\s*h\b"
+_ALLOCATED_RE = re.compile(rf"\b(?:allocation|allocated)\b([^:]*):\s*{_NUMBER}", re.IGNORECASE)
+_CONSUMED_RE = re.compile(rf"\b(?:consommation|consumption|consumed)\b([^:]*):\s*{_NUMBER}", re.IGNORECASE)
+_DATE_RANGE_RE = re.compile(r"\([^)]*\)")
+_PROJECT_ROW_RE = re.compile(r"^\s*\*?\s*([A-Za-z0-9_-]+)\s*\((\d+)\)(.*)$")
+
+
+@dataclass
+class AccountRecord:
+    """Hours allocated to and consumed by one project on one kind of resource."""
+
+    project: str
+    partition: str
+    allocated_hours: float | None = None
+    consumed_hours: float | None = None
+
+    @property
+    def remaining_hours(self) -> float | None:
+        """Hours left on the allocation, if both figures are known."""
+        if self.allocated_hours is None or self.consumed_hours is None:
+            return None
+        return self.allocated_hours - self.consumed_hours
+
+
+@dataclass
+class ProjectRecord:
+    """One project listed by `idrproj`."""
+
+    name: str
+    number: str
+    default: bool
+    active: bool
+
+
+def _hours(text: str) -> float:
+    return float(text.replace(" ", "").replace(",", ""))
+
+
+def _resource(text: str) -> str:
+    """Name of the resource in a header or key such as `Heures GPU V100 (du ...)`: `GPU V100`, or "" if none."""
+    return " ".join(m.group(0).upper() for m in _RESOURCE_RE.finditer(_DATE_RANGE_RE.sub(" ", text)))
+
+
+def parse_accounting(output: str) -> list[AccountRecord]:
+    """Parse `idracct` output into one record per project and resource.
+
+    Returns an empty list unless every figure could be tied to exactly one resource and every resource has both its
+    allocation and its consumption, so that a layout that is not understood is shown as is and never recorded.
+    """
+    records: dict[tuple[str, str], AccountRecord] = {}
+    project, current = "", None
+    for line in output.splitlines():
+        match = _PROJECT_RE.match(line)
+        if match:
+            project, current = match.group(1), None
+            continue
+        match = _ALLOCATED_RE.search(line)
+        if match:
+            partition = _resource(match.group(1)) or _resource(line[: match.start()])
+            if not partition or (project, partition) in records:
+                return []
+            current = records[project, partition] = AccountRecord(project, partition, _hours(match.group(2)))
+            continue
+        match = _CONSUMED_RE.search(line)
+        if match:
+            partition = _resource(match.group(1))
+            record = records.get((project, partition)) if partition else current
+            if record is None or record.consumed_hours is not None:
+                return []
+            record.consumed_hours = _hours(match.group(2))
+    if any(record.consumed_hours is None for record in records.values()):
+        return []
+    return list(records.values())
+
+
+def parse_projects(output: str) -> list[ProjectRecord]:
+    """Parse `idrproj` output (`name (number) [default][active]` lines)."""
+    projects = []
+    for line in output.splitlines():
+        match = _PROJECT_ROW_RE.match(line)
+        if match:
+            name, number, flags = match.groups()
+            projects.append(ProjectRecord(name, number, "default" in flags.lower(), "active" in flags.lower()))
+    return projects
+
+
+def _accounting_ttl() -> float:
+    value = get_value("idris_ttl")
+    return float(value) if value else DEFAULT_ACCOUNTING_TTL
+
+
+def _cache_name(cmd: str) -> str:
+    slug = re.sub(r"\W+", "_", cmd).strip("_")
+    return f"idris-{slug}-{get_remote_user()}"
+
+
+def query(cmd: str, refresh: bool = False, echo: bool = False) -> str:
+    """Return the output of the IDRIS command `cmd`, served from the cache for `idris_ttl` seconds.
+
+    With `echo`, a fresh output is printed as it arrives. Fresh accounting figures are added to the local history.
+    """
+    name = _cache_name(cmd)
+    output = None if refresh else cache.load(name, ttl=_accounting_ttl())
+    if output is not None:
+        if echo:
+            typer.echo(output)
+        return output
+    console = Console(highlight=False)
+    err_console = Console(stderr=True, highlight=False)
+    lines = []
+    try:
+        for stream_name, line in stream(cmd, login_shell=True):
+            if stream_name == "stderr":
+                err_console.print(line, markup=False, soft_wrap=True)
+                continue
+            lines.append(line)
+            if echo:
+                console.print(line, markup=False, soft_wrap=True)
+    except subprocess.CalledProcessError as e:
+        raise typer.Exit(e.returncode) from e
+    output = "\n".join(lines)
+    cache.store(name, output)
+    record_snapshot(parse_accounting(output))
+    return output
+
+
+def _history() -> sqlite3.Connection:
+    db = sqlite3.connect(get_app_dir() / HISTORY_FILE)
+    # One row per run of identical figures: polling a quiet allocation only moves `last_seen`
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS snapshots (user TEXT, project TEXT, partition TEXT, first_seen REAL, "
+        "last_seen REAL, allocated REAL, consumed REAL)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS snapshots_key ON snapshots (user, project, partition, last_seen)")
+    return db
+
+
+def record_snapshot(records: list[AccountRecord], timestamp: float | None = None) -> None:
+    """Append the accounting figures in `records` to the local history."""
+    records = [r for r in records if r.consumed_hours is not None]
+    if not records:
+        return
+    timestamp = time.time() if timestamp is None else timestamp
+    user = get_remote_user()
+    with closing(_history()) as db, db:
+        for record in records:
+            key = (user, record.project, record.partition)
+            last = db.execute(
+                "SELECT rowid, allocated, consumed FROM snapshots WHERE user = ? AND project = ? AND partition = ? "
+                "ORDER BY last_seen DESC LIMIT 1",
+                key,
+            ).fetchone()
+            if last is not None and last[1:] == (record.allocated_hours, record.consumed_hours):
+                db.execute("UPDATE snapshots SET last_seen = ? WHERE rowid = ?", (timestamp, last[0]))
+            else:
+                db.execute(
+                    "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (*key, timestamp, timestamp, record.allocated_hours, record.consumed_hours),
+                )
+
+
+@dataclass
+class BurnRate:
+    """Consumption trend of one allocation over the history window."""
+
+    project: str
+    partition: str
+    allocated_hours: float | None
+    consumed_hours: float
+    hours_per_day: float | None
+    days_left: float | None
+    since: float
+
+    @property
+    def exhaustion(self) -> str:
+        """Date at which the allocation runs out at the current rate."""
+        if self.days_left is None:
+            return "-"
+        return datetime.fromtimestamp(time.time() + self.days_left * 86400).strftime("%Y-%m-%d")  # noqa: DTZ006
+
+
+def burn_rates(days: float = DEFAULT_BURN_RATE_DAYS) -> list[BurnRate]:
+    """Compute the consumption rate of each allocation over the last `days` days of local history."""
+    start = time.time() - days * 86400
+    points: dict[tuple[str, str], list[tuple[float, float | None, float]]] = {}
+    with closing(_history()) as db:
+        rows = db.execute(
+            "SELECT project, partition, first_seen, last_seen, allocated, consumed FROM snapshots "
+            "WHERE user = ? AND last_seen >= ? ORDER BY first_seen",
+            (get_remote_user(), start),
+        ).fetchall()
+    for project, partition, first_seen, last_seen, allocated, consumed in rows:
+        series = points.setdefault((project, partition), [])
+        series.extend([(max(first_seen, start), allocated, consumed), (last_seen, allocated, consumed)])
+
+    rates = []
+    for (project, partition), series in points.items():
+        # Only the points since the allocation last changed or was reset describe the current trend
+        first = 0
+        for i in range(1, len(series)):
+            if series[i][1] != series[i - 1][1] or series[i][2] < series[i - 1][2]:
+                first = i
+        (t0, _, consumed0), (t1, allocated, consumed1) = series[first], series[-1]
+        per_day = (consumed1 - consumed0) / (t1 - t0) * 86400 if t1 - t0 >= 3600 else None
+        days_left = None
+        if per_day and allocated is not None:
+            days_left = max(allocated - consumed1, 0) / per_day
+        rates.append(BurnRate(project, partition, allocated, consumed1, per_day, days_left, t0))
+    return rates
+
+
+def _fmt_number(hours: float | None) -> str:
+    return "-" if hours is None else f"{hours:,.0f}"
+
+
+def _print_accounting(output: str, as_json: bool) -> None:
+    records = parse_accounting(output)
+    if as_json:
+        typer.echo(json.dumps([asdict(record) for record in records], indent=2))
+        return
+    if not records:
+        # Unknown layout: show it as is rather than nothing
+        typer.echo(output)
+        return
+    table = Table("Project", "Partition", "Allocated (h)", "Consumed (h)", "Remaining (h)", box=box.MINIMAL)
+    for record in records:
+        table.add_row(
+            record.project,
+            record.partition,
+            _fmt_number(record.allocated_hours),
+            _fmt_number(record.consumed_hours),
+            _fmt_number(record.remaining_hours),
+        )
+    Console().print(table)
+
+
+_REFRESH_OPTION = typer.Option(False, "--refresh", help="Ignore the cached output (kept for `idris_ttl` seconds)")
+_JSON_OPTION = typer.Option(False, "--json", help="Print the parsed records as JSON")
+_RAW_OPTION = typer.Option(False, "--raw", help="Print the command output as is")
+
 
 @app.command()
-def allocations(summary: bool = typer.Option(False, "--summary", "-s", help="Summarize output")) -> None:
+def allocations(
+    summary: bool = typer.Option(False, "--summary", "-s", help="Summarize output"),
+    refresh: bool = _REFRESH_OPTION,
+    as_json: bool = _JSON_OPTION,
+    raw: bool = _RAW_OPTION,
+) -> None:
     """Indicate the CPU and/or GPU hours allocations."""
-    typer.echo(run("idracct" + (" -s" if summary else ""), login_shell=True))
+    output = query("idracct" + (" -s" if summary else ""), refresh=refresh, echo=raw)
+    if not raw:
+        _print_accounting(output, as_json)
 
 
 @app.command()
-def projects() -> None:
+def projects(refresh: bool = _REFRESH_OPTION, as_json: bool = _JSON_OPTION, raw: bool = _RAW_OPTION) -> None:
     """Display the projects or change the default project."""
-    typer.echo(run("idrproj", login_shell=True))
+    output = query("idrproj", refresh=refresh, echo=raw)
+    if raw:
+        return
+    records = parse_projects(output)
+    if as_json:
+        typer.echo(json.dumps([asdict(record) for record in records], indent=2))
+    elif not records:
+        typer.echo(output)
+    else:
+        table = Table("Project", "Number", "Default", "Active", box=box.MINIMAL)
+        for record in records:
+            table.add_row(record.name, record.number, "✓" if record.default else "", "✓" if record.active else "")
+        Console().print(table)
 
 
 @app.command()
@@ -27,6 +318,9 @@ def consumption(
         False, "--short", "-s", help="Display the status of your accounts without the disclaimer"
     ),
     accounts: list[str] | None = typer.Option(None, "--accounts", "-A", help="Display the status of specific accounts"),
+    refresh: bool = _REFRESH_OPTION,
+    as_json: bool = _JSON_OPTION,
+    raw: bool = _RAW_OPTION,
 ) -> None:
     """Verify the consumption status of your project."""
     cmd = "idr_compuse"
@@ -34,7 +328,286 @@ def consumption(
         cmd += " -s"
     if accounts is not None:
         cmd += f" -A {','.join(accounts)}"
-    typer.echo(run(cmd, login_shell=True))
+    output = query(cmd, refresh=refresh, echo=raw)
+    if not raw:
+        _print_accounting(output, as_json)
+
+
+@app.command()
+def burn_rate(
+    days: float = typer.Option(DEFAULT_BURN_RATE_DAYS, "--days", "-d", help="Length of the history window in days"),
+    as_json: bool = _JSON_OPTION,
+) -> None:
+    """Show consumption rates and time to exhaustion from the locally recorded history (no remote call)."""
+    rates = burn_rates(days)
+    if as_json:
+        typer.echo(json.dumps([{**asdict(rate), "exhaustion": rate.exhaustion} for rate in rates], indent=2))
+        return
+    if not rates:
+        typer.echo("No history yet: it is recorded by `jz idris allocations` and `jz idris consumption`.")
+        return
+    table = Table(
+        "Project",
+        "Partition",
+        "Consumed (h)",
+        "Remaining (h)",
+        "Rate (h/day)",
+        "Days left",
+        "Runs out",
+        box=box.MINIMAL,
+    )
+    for rate in rates:
+        remaining = None if rate.allocated_hours is None else rate.allocated_hours - rate.consumed_hours
+        table.add_row(
+            rate.project,
+            rate.partition,
+            _fmt_number(rate.consumed_hours),
+            _fmt_number(remaining),
+            "-" if rate.hours_per_day is None else f"{rate.hours_per_day:,.1f}",
+            "-" if rate.days_left is None else f"{rate.days_left:.1f}",
+            rate.exhaustion,
+        )
+    Console().print(table)
+
+
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4, "P": 1024**5}
+_QUANTITY_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGTP]?)i?B?\s*$", re.IGNORECASE)
+# Usage figures are only read from these keys (compared lowercase, without `_`/`-`), with their unit in bytes or
+# inodes; when several are present the first listed wins. `block*`/`files*` are the Spectrum Scale (`mmlsquota`) names,
+# in KiB. Other numeric keys, such as uid, gid or grace periods, are ignored.
+_QUOTA_KEYS = {
+    "bytes_used": (
+        ("bytesused", 1),
+        ("usedbytes", 1),
+        ("spaceused", 1),
+        ("sizeused", 1),
+        ("used", 1),
+        ("usage", 1),
+        ("blockusage", 1024),
+    ),
+    "bytes_limit": (
+        ("byteslimit", 1),
+        ("bytesquota", 1),
+        ("quotabytes", 1),
+        ("spacequota", 1),
+        ("sizequota", 1),
+        ("sizelimit", 1),
+        ("quota", 1),
+        ("limit", 1),
+        ("blockquota", 1024),
+        ("blocklimit", 1024),
+    ),
+    "inodes_used": (("inodesused", 1), ("usedinodes", 1), ("inodes", 1), ("filesused", 1), ("filesusage", 1)),
+    "inodes_limit": (("inodeslimit", 1), ("inodesquota", 1), ("quotainodes", 1), ("filesquota", 1), ("fileslimit", 1)),
+}
+_QUOTA_NAME_KEYS = ("space", "filesystem", "filesystemname", "fs", "name")
+
+
+@dataclass
+class QuotaRecord:
+    """Usage of one disk space against its byte and inode quotas, from `idr_quota_user -j`."""
+
+    space: str
+    bytes_used: float | None = None
+    bytes_limit: float | None = None
+    inodes_used: float | None = None
+    inodes_limit: float | None = None
+
+
+def _quantity(value: object) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _QUANTITY_RE.match(value) if isinstance(value, str) else None
+    return float(match.group(1)) * _UNITS[match.group(2).upper()] if match else None
+
+
+def _normalize_key(key: str) -> str:
+    return re.sub(r"[\W_]+", "", key).lower()
+
+
+def _quota_fields(entry: dict) -> dict[str, float]:
+    """Map the known usage fields of one JSON object to `QuotaRecord` fields."""
+    values = {_normalize_key(key): value for key, value in entry.items()}
+    fields = {}
+    for field, keys in _QUOTA_KEYS.items():
+        for key, scale in keys:
+            number = _quantity(values.get(key))
+            if number is not None:
+                fields[field] = number * scale
+                break
+    return fields
+
+
+def parse_quota(data: object, name: str = "") -> list[QuotaRecord]:
+    """Find the usage figures in the JSON printed by `idr_quota_user -j`, one record per object holding some.
+
+    A record is named after the object's `space`/`filesystem`/`name` field, or else its path of keys in the document;
+    objects with neither (e.g. unnamed list items) are dropped.
+    """
+    records = []
+    if isinstance(data, list):
+        # Items of a list are told apart by their own name field only
+        for item in data:
+            records += parse_quota(item)
+    elif isinstance(data, dict):
+        fields = _quota_fields(data)
+        names = {_normalize_key(key): value for key, value in data.items()}
+        label = next((names[k] for k in _QUOTA_NAME_KEYS if isinstance(names.get(k), str) and names[k]), name)
+        if fields and label:
+            records.append(QuotaRecord(label, **fields))
+        for key, value in data.items():
+            if isinstance(value, (dict, list)):
+                records += parse_quota(value, f"{name}/{key}" if name else key)
+    return records
+
+
+def _fmt_bytes(size: float | None) -> str:
+    if size is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if abs(size) < 1024 or unit == "TiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} PiB"
+
+
+def _fmt_usage(used: float | None, limit: float | None) -> str:
+    if used is None or not limit:
+        return "-"
+    percent = 100 * used / limit
+    return f"[red]{percent:.0f}%[/red]" if percent >= 90 else f"{percent:.0f}%"
+
+
+# One shard per top-level directory of the scanned root, plus one (`.`) for the files directly under it. A shard sums
+# the allocated bytes and the inodes of every entry below it, down to `depth` levels from the root, and keeps its `top`
+# largest directories by bytes and by inodes. Results are collected by a single reader so that the blocks of parallel
+# shards are not interleaved.
+_BREAKDOWN_SCRIPT = """
+root=%(root)s
+if [ ! -d "$root" ]; then
+  echo "ERROR: not a directory: $root"
+  exit 1
+fi
+
+__jz_scan_shard() {
+  if [ "$1" = . ]; then
+    set -- "$1" "$root" -mindepth 1 -maxdepth 1 ! -type d
+  else
+    set -- "$1" "$root/$1"
+  fi
+  name=$1
+  shift
+  out=$(mktemp)
+  entries=$(mktemp)
+  find "$@" -xdev -printf '%%y\\t%%b\\t%%P\\n' 2>/dev/null | awk -F '\\t' -v name="$name" -v depth=%(depth)d \\
+    -v shard=%(shard)s -v out="$out" '
+    { n = split($3, parts, "/"); if ($1 != "d") n--; key = name
+      for (i = 1; i <= n && i < depth; i++) key = key "/" parts[i]
+      bytes[key] += $2 * 512; inodes[key]++; total_bytes += $2 * 512; total_inodes++ }
+    END { printf "%%s\\t%%.0f\\t%%d\\t%%s\\n", shard, total_bytes, total_inodes, name > out
+          for (key in bytes) printf "%(entry)s\\t%%.0f\\t%%d\\t%%s\\n", bytes[key], inodes[key], key }' > "$entries"
+  { sort -t "$(printf '\\t')" -k2,2nr "$entries" | head -n %(top)d
+    sort -t "$(printf '\\t')" -k3,3nr "$entries" | head -n %(top)d; } | sort -u >> "$out"
+  rm -f "$entries"
+  echo "$out"
+}
+export -f __jz_scan_shard
+export root
+
+shards=$(mktemp)
+{ echo .; find "$root" -mindepth 1 -maxdepth 1 -type d -printf '%%P\\n'; } > "$shards"
+echo "%(shards)s $(wc -l < "$shards")"
+xargs -d '\\n' -r -n 1 -P %(workers)d bash -c '__jz_scan_shard "$1"' _ < "$shards" | while read -r out; do
+  cat "$out"
+  rm -f "$out"
+done
+rm -f "$shards"
+"""
+
+
+@dataclass
+class UsageEntry:
+    """Allocated bytes and inodes below one directory."""
+
+    path: str
+    bytes: int
+    inodes: int
+
+
+def breakdown_script(
+    root: str, depth: int = 1, top: int = DEFAULT_BREAKDOWN_TOP, workers: int = DEFAULT_BREAKDOWN_WORKERS
+) -> str:
+    """Build the remote script summing usage below `root`, one parallel shard per top-level directory."""
+    return _BREAKDOWN_SCRIPT % {
+        "root": shlex.quote(root),
+        "depth": depth,
+        "top": top,
+        "workers": workers,
+        "shard": _SHARD_MARKER,
+        "shards": _SHARDS_MARKER,
+        "entry": _ENTRY_MARKER,
+    }
+
+
+def _resolve_space(space: str) -> str:
+    return get_remote_fact(space.lower()) if space.lower() in _SPACES else space
+
+
+def _breakdown_cache_name(root: str) -> str:
+    slug = re.sub(r"\W+", "_", root).strip("_")
+    return f"disk-breakdown-{slug}-{get_remote_user()}"
+
+
+def _scan(root: str, depth: int, top: int, workers: int) -> dict:
+    """Run the breakdown scan of `root`, printing each shard as it finishes, and cache the result."""
+    console = Console(highlight=False)
+    shards, entries, count = [], [], 0
+    with console.status(f"Scanning {root}..."):
+        for stream_name, line in stream(breakdown_script(root, depth, top, workers)):
+            fields = line.split("\t")
+            if stream_name == "stderr" or line.startswith("ERROR"):
+                console.print(line, markup=False)
+            elif line.startswith(_SHARDS_MARKER):
+                count = int(line.split()[1])
+            elif fields[0] in (_SHARD_MARKER, _ENTRY_MARKER) and len(fields) == 4:
+                entry = UsageEntry(fields[3], int(fields[1]), int(fields[2]))
+                if fields[0] == _ENTRY_MARKER:
+                    entries.append(entry)
+                    continue
+                shards.append(entry)
+                console.print(
+                    f"✓ [{len(shards)}/{count}] {entry.path}: {_fmt_bytes(entry.bytes)}, {entry.inodes:,} inodes",
+                    markup=False,
+                )
+    scan = {
+        "root": root,
+        "depth": depth,
+        "top": top,
+        "shards": [asdict(e) for e in shards],
+        "entries": [asdict(e) for e in entries],
+    }
+    cache.store(_breakdown_cache_name(root), scan)
+    return scan
+
+
+def _print_breakdown(scan: dict, top: int, sort: str) -> None:
+    entries = [UsageEntry(**e) for e in scan["entries"]]
+    total_bytes = sum(e["bytes"] for e in scan["shards"])
+    total_inodes = sum(e["inodes"] for e in scan["shards"])
+    table = Table("Path", "Size", "Share", "Inodes", "Share", box=box.MINIMAL)
+    for entry in sorted(entries, key=lambda e: getattr(e, sort), reverse=True)[:top]:
+        table.add_row(
+            entry.path,
+            _fmt_bytes(entry.bytes),
+            f"{100 * entry.bytes / total_bytes:.1f}%" if total_bytes else "-",
+            f"{entry.inodes:,}",
+            f"{100 * entry.inodes / total_inodes:.1f}%" if total_inodes else "-",
+        )
+    console = Console()
+    console.print(table)
+    console.print(f"Total under {scan['root']}: {_fmt_bytes(total_bytes)}, {total_inodes:,} inodes")
 
 
 @app.command()
@@ -54,9 +627,37 @@ def disk_quota(
     space: list[str] | None = typer.Option(
         None, "--space", "-s", help="Filter the output for the given disk space(s)."
     ),
-    json: bool | None = typer.Option(False, "--json", "-j", help="Display a json formatted data"),
+    as_json: bool = typer.Option(False, "--json", "-j", help="Display a json formatted data"),
+    breakdown: str | None = typer.Option(
+        None,
+        "--breakdown",
+        "-b",
+        help="Instead of the quotas, show what uses the space (home, work, scratch, store or a remote path).",
+    ),
+    depth: int = typer.Option(1, "--depth", help="With --breakdown, directory levels below the space to report"),
+    top: int = typer.Option(DEFAULT_BREAKDOWN_TOP, "--top", help="With --breakdown, number of directories to show"),
+    sort: str = typer.Option("bytes", "--sort", help="With --breakdown, order by 'bytes' or 'inodes'"),
+    workers: int = typer.Option(
+        DEFAULT_BREAKDOWN_WORKERS, "--workers", "-w", help="With --breakdown, top-level directories scanned at once"
+    ),
+    refresh: bool = typer.Option(False, "--refresh", help="With --breakdown, rescan instead of showing the last scan"),
 ) -> None:
     """Show quota disk infos (home/work/store)."""
+    if breakdown is not None:
+        if sort not in ("bytes", "inodes"):
+            typer.echo("❌ --sort must be 'bytes' or 'inodes'.")
+            raise typer.Exit(1)
+        root = _resolve_space(breakdown)
+        scan = None if refresh else cache.load(_breakdown_cache_name(root))
+        if scan is None or scan["depth"] != depth or scan["top"] < top:
+            scan = _scan(root, depth, top, workers)
+        _print_breakdown(scan, top, sort)
+        age = cache.age(_breakdown_cache_name(root))
+        if age is not None and age >= 1:
+            ago = f"{age:.0f}s" if age < 120 else f"{age / 60:.0f} min"
+            typer.echo(f"(scan from {ago} ago, use --refresh to rescan)")
+        return
+
     cmd = "idr_quota_user"
     if project is not None:
         cmd += f" -p {project}"
@@ -67,6 +668,26 @@ def disk_quota(
         space = space.replace(",", " ")
         space = [s.strip() for s in space.split()]
         cmd += f" -s {' '.join(space)}"
-    if json:
-        cmd += " -j"
-    typer.echo(run(cmd, login_shell=True))
+    output = run(cmd + " -j", login_shell=True)
+    if as_json:
+        typer.echo(output)
+        return
+    try:
+        records = parse_quota(json.loads(output))
+    except ValueError:
+        records = []
+    if not records:
+        typer.echo(output)
+        return
+    table = Table("Space", "Used", "Quota", "Use", "Inodes", "Inode quota", "Use", box=box.MINIMAL)
+    for record in records:
+        table.add_row(
+            record.space,
+            _fmt_bytes(record.bytes_used),
+            _fmt_bytes(record.bytes_limit),
+            _fmt_usage(record.bytes_used, record.bytes_limit),
+            _fmt_number(record.inodes_used),
+            _fmt_number(record.inodes_limit),
+            _fmt_usage(record.inodes_used, record.inodes_limit),
+        )
+    Console().print(table)
@@ -1,28 +1,88 @@
 """Main CLI entry point for jz_cli."""
 
+from __future__ import annotations
+
+import importlib
+from pathlib import Path  # noqa: TC003
+from typing import Any
+
 import typer
+from typer.core import TyperCommand, TyperGroup
+
+from . import trace
+from .config import PROFILE_ENV, ensure_config, use_profile
+
+# name -> (module defining the sub-app, short help shown by `jz --help`). Sub-apps are only imported when their
+# command is invoked, so `jz ssh status` does not pay for `slurm`, `sync` and their dependencies.
+SUBCOMMANDS = {
+    "sync": ("jz_cli.sync", "Sync local directory to Jean Zay via rsync."),
+    "pull": ("jz_cli.pull", "Pull files from Jean Zay via rsync (the reverse of `jz sync`)."),
+    "setup": ("jz_cli.setup", "Interactive setup wizard for jz."),
+    "config": ("jz_cli.config", "Inspect or modify jz configuration."),
+    "ssh": ("jz_cli.ssh", "SSH tool for persistent connection and remote command execution."),
+    "idris": ("jz_cli.idris", "IDRIS-specific commands."),
+    "slurm": ("jz_cli.slurm", "SLURM-specific commands."),
+    "scratch": ("jz_cli.scratch", "Refresh timestamps under the remote SCRATCH filesystem."),
+}
+
+
+class LazyCommand(TyperCommand):
+    """Placeholder for a sub-app listed in the help, importing the real command once it is invoked."""
+
+    def __init__(self, name: str, module: str, help: str) -> None:  # noqa: A002
+        super().__init__(name=name, help=help)
+        self.module = module
+        self._command = None
+
+    def load(self) -> Any:
+        """Import the sub-app and return its click command (a group, or the command of a single-command app)."""
+        if self._command is None:
+            command = typer.main.get_command(importlib.import_module(self.module).app)
+            command.name = self.name
+            self._command = command
+        return self._command
 
-from .config import app as config_app
-from .config import ensure_config
-from .idris import app as idris_app
-from .scratch import app as scratch_app
-from .setup import app as setup_app
-from .slurm import app as slurm_app
-from .ssh import app as ssh_app
-from .sync import app as sync_app
-
-app = typer.Typer()
-app.add_typer(sync_app)
-app.add_typer(setup_app)
-app.add_typer(config_app, name="config")
-app.add_typer(ssh_app, name="ssh")
-app.add_typer(idris_app, name="idris")
-app.add_typer(slurm_app, name="slurm")
-app.add_typer(scratch_app, name="scratch")
+    def make_context(self, info_name: str | None, args: list[str], parent: Any = None, **extra: Any) -> Any:
+        """Build the context of the real command, which then handles parsing, help and invocation."""
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+
+class LazyTyperGroup(TyperGroup):
+    """Root group whose subcommands are `LazyCommand`s."""
+
+    def __init__(self, **attrs: Any) -> None:
+        super().__init__(**attrs)
+        for name, (module, short_help) in SUBCOMMANDS.items():
+            self.commands.setdefault(name, LazyCommand(name, module, short_help))
+
+
+app = typer.Typer(cls=LazyTyperGroup)
 
 
 @app.callback()
-def main(ctx: typer.Context) -> None:
+def main(
+    ctx: typer.Context,
+    config_profile: str = typer.Option(
+        None, "--config-profile", envvar=PROFILE_ENV, help="Named configuration profile (login/account) to use."
+    ),
+    profile: bool = typer.Option(
+        False, "--profile", help="Time the remote operations and print a breakdown when the command ends."
+    ),
+    trace_file: Path | None = typer.Option(
+        None, "--trace", help="With --profile, also write the timings to this file as a Chrome trace."
+    ),
+) -> None:
     """Jz CLI - Manage your Jean Zay projects and files easily from the command line."""
+    use_profile(config_profile)
+    if profile or trace_file is not None or trace.enabled():
+        trace.enable()
+        ctx.call_on_close(lambda: _report_profile(trace_file))
     if ctx.invoked_subcommand != "setup":
         ensure_config()
+
+
+def _report_profile(trace_file: Path | None) -> None:
+    trace.print_summary()
+    if trace_file is not None:
+        trace.write_chrome_trace(trace_file)
+        typer.echo(f"Trace written to {trace_file}", err=True)
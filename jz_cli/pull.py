@@ -0,0 +1,168 @@
+"""Commands for pulling results back from Jean Zay cluster."""
+
+from __future__ import annotations
+
+import shlex
+from fnmatch import fnmatch
+from pathlib import Path
+
+import typer
+
+from .config import get_value
+from .ssh import run, start_master_connection
+from .sync import (
+    DEFAULT_EXCLUDES,
+    combine_stats,
+    get_remote_base_dir,
+    is_excluded,
+    print_shard_summary,
+    print_transfer_report,
+    rsync_command,
+    run_sharded,
+)
+from .transfer import get_profile
+
+app = typer.Typer(help="Pull results from Jean Zay cluster.")
+
+# Interrupted files are kept here (next to their destination) and used as the basis of the next attempt
+PARTIAL_DIR = ".jz-partial"
+DEFAULT_CHECKPOINT_PATTERN = "checkpoint*"
+
+
+def list_remote_files(remote_base_dir: Path, paths: list[str]) -> list[tuple[str, int, float]]:
+    """List `(path, size, mtime)` for every file below `paths` (relative to `remote_base_dir`) in one remote call."""
+    targets = " ".join(shlex.quote(p) for p in paths) if paths else "."
+    cmd = (
+        f"cd {shlex.quote(str(remote_base_dir))} && "
+        f"find {targets} -type f -not -path '*/{PARTIAL_DIR}/*' -printf '%s\\t%T@\\t%p\\n'"
+    )
+    files = []
+    for line in run(cmd).splitlines():
+        size, mtime, path = line.split("\t", 2)
+        files.append((path[2:] if path.startswith("./") else path, int(size), float(mtime)))
+    return sorted(files)
+
+
+def _excluded(path: str, patterns: list[str]) -> bool:
+    """Whether `path` or one of its parent directories matches an rsync-style exclude pattern."""
+    parts = path.split("/")
+    return any(is_excluded("/".join(parts[:i]), i < len(parts), patterns) for i in range(1, len(parts) + 1))
+
+
+def job_log_filter(job_ids: list[str]) -> list[str]:
+    """Patterns matching the log files of `job_ids`, named `job_logs/%x_%j.*` (or `%x_%A_%a.*` for job arrays)."""
+    return [pattern for job_id in job_ids for pattern in (f"*_{job_id}.*", f"*_{job_id}_*.*")]
+
+
+def keep_last(files: list[tuple[str, int, float]], pattern: str, count: int) -> list[tuple[str, int, float]]:
+    """Drop all but the `count` newest checkpoints of each directory.
+
+    A checkpoint is a file or directory whose name matches `pattern` (e.g. `checkpoint-1000/` or `epoch=3.ckpt`); the
+    age of a directory is that of its newest file. Files outside checkpoints are kept.
+    """
+    checkpoints: dict[str, dict[str, float]] = {}
+    owner = {}
+    for path, _, mtime in files:
+        parts = path.split("/")
+        for i, part in enumerate(parts):
+            if fnmatch(part, pattern):
+                checkpoint = "/".join(parts[: i + 1])
+                parent = checkpoints.setdefault("/".join(parts[:i]), {})
+                parent[checkpoint] = max(parent.get(checkpoint, 0), mtime)
+                owner[path] = checkpoint
+                break
+    kept = set()
+    for siblings in checkpoints.values():
+        kept.update(sorted(siblings, key=siblings.get, reverse=True)[:count])
+    return [f for f in files if f[0] not in owner or owner[f[0]] in kept]
+
+
+def select_files(
+    files: list[tuple[str, int, float]],
+    excludes: list[str],
+    includes: list[str] | None = None,
+    job_ids: list[str] | None = None,
+    last: int | None = None,
+    checkpoint_pattern: str = DEFAULT_CHECKPOINT_PATTERN,
+) -> list[tuple[str, int, float]]:
+    """Apply the exclude, include, job ID and last-checkpoints filters of `jz pull` to a remote file listing."""
+    files = [f for f in files if not _excluded(f[0], excludes)]
+    if includes:
+        files = [f for f in files if is_excluded(f[0], False, includes)]
+    if job_ids:
+        files = [f for f in files if is_excluded(f[0], False, job_log_filter(job_ids))]
+    if last is not None:
+        files = keep_last(files, checkpoint_pattern, last)
+    return files
+
+
+@app.command()
+def pull(
+    paths: list[str] = typer.Argument(None, help="Remote paths to pull, relative to the remote base directory"),
+    local_dir: str = typer.Option(Path.cwd(), "--local-dir", "-l", help="Local directory to pull into"),
+    remote_base_dir: str | None = typer.Option(None, help="Remote base directory"),
+    include: list[str] = typer.Option(
+        None, "--include", "-i", help="Only pull files matching these patterns (can repeat, e.g. '*.json')"
+    ),
+    exclude: list[str] = typer.Option(None, "--exclude", "-e", help="Additional rsync exclude patterns (can repeat)"),
+    job: list[str] = typer.Option(None, "--job", help="Only pull the job_logs/ files of these job IDs (can repeat)"),
+    last: int | None = typer.Option(None, "--last", min=1, help="Only pull the N newest checkpoints per directory"),
+    checkpoint_pattern: str = typer.Option(
+        DEFAULT_CHECKPOINT_PATTERN, "--checkpoint-pattern", help="Name pattern of the checkpoints counted by --last"
+    ),
+    jobs: int = typer.Option(1, "--jobs", "-j", min=1, help="Number of parallel rsync streams (balanced by size)"),
+    compress: str = typer.Option(
+        "auto", "--compress", help="auto, none, zlib, zstd or lz4, optionally with a level (e.g. zstd:3)"
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", "-n", help="List the files that would be pulled"),
+    stats: bool = typer.Option(False, "--stats", help="Report bytes on the wire versus logical bytes"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Verbose output"),
+) -> None:
+    """Pull files from Jean Zay via rsync (the reverse of `jz sync`)."""
+    remote_user = get_value("remote_user")
+
+    local_dir = Path(local_dir)
+    if remote_base_dir is None:
+        remote_base_dir = get_remote_base_dir(local_dir)
+    remote_base_dir = Path(remote_base_dir)
+    if job and not paths:
+        paths = ["job_logs"]
+
+    all_excludes = DEFAULT_EXCLUDES + (exclude or [])
+    files = select_files(
+        list_remote_files(remote_base_dir, paths or []), all_excludes, include, job, last, checkpoint_pattern
+    )
+
+    if not files:
+        typer.echo(f"Nothing to pull from {remote_user}:{remote_base_dir}.")
+        return
+    total = sum(size for _, size, _ in files)
+    if dry_run:
+        for path, size, _ in files:
+            typer.echo(f"{size:>14,}  {path}")
+        typer.echo(f"{len(files)} file(s), {total:,} bytes")
+        return
+
+    profile, compress_choice = get_profile(remote_user, compress)
+    base_cmd = rsync_command(
+        all_excludes, False, verbose, [*profile.rsync_args(compress_choice), f"--partial-dir={PARTIAL_DIR}"]
+    )
+    src, dest = f"{remote_user}:{remote_base_dir}/", f"{local_dir}/"
+    typer.echo(
+        f"Pulling {len(files)} file(s) ({total:,} bytes) from {remote_user}:{remote_base_dir} to {local_dir} ..."
+    )
+    # All streams multiplex over one master connection instead of authenticating separately
+    start_master_connection()
+    local_dir.mkdir(parents=True, exist_ok=True)
+    entries = [(path, size) for path, size, _ in files]
+    results = run_sharded(base_cmd, entries, jobs, src, dest, recursive=False)
+    for result in results:
+        if verbose or result.returncode != 0:
+            typer.echo(result.output, nl=False)
+    if jobs > 1:
+        print_shard_summary(results)
+    if stats:
+        print_transfer_report(combine_stats(results), profile)
+    returncode = max((r.returncode for r in results), default=0)
+    if returncode != 0:
+        raise typer.Exit(returncode)
@@ -0,0 +1,72 @@
+"""Cached facts about the remote account: filesystem paths, username and rsync base directories."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from . import cache
+from .config import get_value
+from .ssh import get_remote_user, run
+
+DEFAULT_FACTS_TTL = 24 * 3600
+_FACT_VARS = ("USER", "HOME", "SCRATCH", "WORK", "STORE")
+_RSYNC_MARKER = "__JZ_RSYNC_VERSION__"
+
+
+def _facts_cache_name() -> str:
+    return f"remote-facts-{get_remote_user()}"
+
+
+def _facts_ttl() -> float:
+    value = get_value("remote_facts_ttl")
+    return float(value) if value else DEFAULT_FACTS_TTL
+
+
+def refresh_remote_facts() -> dict:
+    """Fetch the remote facts in a single login-shell call and cache them."""
+    # One `NAME=value` line per fact, so an unset variable cannot shift the others
+    cmd = (
+        "printf '"
+        + "".join(f"{name}=%s\\n" for name in _FACT_VARS)
+        + "' "
+        + " ".join(f'"${name}"' for name in _FACT_VARS)
+    )
+    output = run(f"{cmd}; echo {_RSYNC_MARKER}; rsync --version 2>/dev/null || true", login_shell=True)
+    output, _, rsync_version = output.partition(_RSYNC_MARKER)
+    values = dict(line.split("=", 1) for line in output.splitlines() if "=" in line)
+    facts = {name.lower(): values.get(name, "") for name in _FACT_VARS}
+    facts["rsync_version"] = rsync_version.strip()
+    facts["rsync_base_dirs"] = {}
+    cache.store(_facts_cache_name(), facts)
+    return facts
+
+
+def get_remote_facts() -> dict:
+    """Return the cached remote facts, fetching them if missing or expired."""
+    facts = cache.load(_facts_cache_name(), ttl=_facts_ttl())
+    if facts is None:
+        facts = refresh_remote_facts()
+    return facts
+
+
+def get_remote_fact(name: str) -> str:
+    """Return a single remote fact (`user`, `home`, `scratch`, `work`, `store` or `rsync_version`)."""
+    return get_remote_facts()[name]
+
+
+def invalidate_remote_facts() -> None:
+    """Drop the cached remote facts."""
+    cache.invalidate(_facts_cache_name())
+
+
+def get_rsync_base_dir(local_dir: Path) -> Path:
+    """Get the remote rsync directory for `local_dir` (`$SCRATCH/rsync/<basename>`), resolving it once."""
+    local_dir = Path(local_dir).resolve()
+    facts = get_remote_facts()
+    resolved = facts["rsync_base_dirs"].get(str(local_dir))
+    if resolved is None:
+        resolved = str(Path(facts["scratch"]) / "rsync" / local_dir.name)
+        facts["rsync_base_dirs"][str(local_dir)] = resolved
+        cache.store(_facts_cache_name(), facts, timestamp=time.time() - (cache.age(_facts_cache_name()) or 0))
+    return Path(resolved)
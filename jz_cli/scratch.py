@@ -2,17 +2,34 @@
 
 from __future__ import annotations
 
+import subprocess
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
 import typer
+from rich.console import Console
 
-from .ssh import run
+from .remote import get_remote_fact
+from .slurm import CPUResource, render_sbatch_script, upload_sbatch_script
+from .ssh import run_batch, stream
 
 app = typer.Typer(help="Refresh timestamps under the remote SCRATCH filesystem.")
 
+DEFAULT_WORKERS = 4
+_SHARDS_MARKER = "__JZ_SHARDS__"
+_SHARD_MARKER = "__JZ_SHARD__"
+_START_MARKER = "__JZ_START__"
+_JOB_MARKER = "__JZ_JOB__"
+_DONE_MARKER = "__JZ_DONE__"
+PROGRESS_FILE = "$SCRATCH/.jz/renew.progress"
+JOB_NAME = "jz-scratch-renew"
 
-@app.command()
-def renew() -> None:
-    """Refresh file and directory timestamps under remote $SCRATCH."""
-    cmd = """
+# Each top-level directory of $SCRATCH is one shard; files directly under $SCRATCH form one more shard (`.`). `find`
+# counts scanned and selected entries by writing one byte per entry to a counter file, so no second traversal is
+# needed. With a progress file, every finished shard is appended to it and shards that already succeeded are skipped,
+# until a run completes and the next one starts over.
+_RENEW_SCRIPT = """
 if [ -z "$SCRATCH" ]; then
   echo "ERROR: SCRATCH environment variable is not set on the remote host."
   exit 1
@@ -23,9 +40,249 @@ if [ ! -d "$SCRATCH" ]; then
   exit 1
 fi
 
-find "$SCRATCH" -mindepth 1 \\( -type f -o -type d \\) -exec touch -c {} +
-echo "Renewed timestamps under $SCRATCH."
+__jz_renew_shard() {
+  start=$(date +%%s%%N)
+  counts=$(mktemp -d) || return 1
+  if [ "$1" = . ]; then
+    set -- "$1" "$SCRATCH" -mindepth 1 -maxdepth 1 -type f
+  else
+    set -- "$1" "$SCRATCH/$1" \\( -type f -o -type d \\)
+  fi
+  name=$1
+  shift
+  if [ "$JZ_DRY_RUN" = 1 ]; then
+    find "$@" -fprintf "$counts/scanned" x $JZ_AGE_FILTER -fprintf "$counts/touched" x
+  else
+    find "$@" -fprintf "$counts/scanned" x $JZ_AGE_FILTER -fprintf "$counts/touched" x -print0 \\
+      | xargs -0 -r touch -c
+  fi
+  status=$?
+  line="%(shard)s $(stat -c %%s "$counts/scanned") $(stat -c %%s "$counts/touched") \\
+$(( ($(date +%%s%%N) - start) / 1000000 )) $status $name"
+  echo "$line"
+  [ -n "$JZ_PROGRESS" ] && echo "$line" >> "$JZ_PROGRESS"
+  rm -rf "$counts"
+  return $status
+}
+export -f __jz_renew_shard
+export JZ_DRY_RUN=%(dry_run)d JZ_AGE_FILTER="%(age_filter)s" JZ_PROGRESS="%(progress)s"
+
+finished=/dev/null
+if [ -n "$JZ_PROGRESS" ]; then
+  mkdir -p "$(dirname "$JZ_PROGRESS")"
+  grep -q '^%(done)s' "$JZ_PROGRESS" 2>/dev/null && mv "$JZ_PROGRESS" "$JZ_PROGRESS.prev"
+  [ -s "$JZ_PROGRESS" ] || echo "%(start)s $(date +%%s)" >> "$JZ_PROGRESS"
+  [ -n "$SLURM_JOB_ID" ] && echo "%(job)s $SLURM_JOB_ID $(date +%%s)" >> "$JZ_PROGRESS"
+  finished=$(mktemp)
+  sed -n 's/^%(shard)s [0-9]* [0-9]* [0-9]* 0 //p' "$JZ_PROGRESS" > "$finished"
+fi
+shards=$(mktemp)
+pending=$(mktemp)
+{ echo .; find "$SCRATCH" -mindepth 1 -maxdepth 1 -type d -printf '%%P\\n'; } > "$shards"
+grep -vxF -f "$finished" "$shards" > "$pending"
+line="%(shards)s $(wc -l < "$shards") $(( $(wc -l < "$shards") - $(wc -l < "$pending") ))"
+echo "$line"
+[ -n "$JZ_PROGRESS" ] && echo "$line" >> "$JZ_PROGRESS"
+xargs -d '\\n' -r -n 1 -P %(workers)d bash -c '__jz_renew_shard "$1"' _ < "$pending"
+status=$?
+[ -n "$JZ_PROGRESS" ] && [ $status -eq 0 ] && echo "%(done)s $(date +%%s)" >> "$JZ_PROGRESS"
+rm -f "$shards" "$pending"
+[ "$finished" = /dev/null ] || rm -f "$finished"
+exit $status
 """
-    output = run(cmd, login_shell=True)
-    if output:
-        typer.echo(output)
+
+
+@dataclass
+class ShardProgress:
+    """Counters reported by one finished renewal shard."""
+
+    path: str
+    scanned: int
+    touched: int
+    elapsed: float
+    returncode: int
+
+
+def renew_script(
+    workers: int = DEFAULT_WORKERS, older_than: int = 0, dry_run: bool = False, progress: str | None = None
+) -> str:
+    """Build the remote script renewing $SCRATCH in `workers` parallel shards.
+
+    Only entries not accessed for more than `older_than` days are touched (all of them when 0); with `dry_run` they
+    are only counted. With a `progress` file, the renewal resumes after the shards an interrupted run finished.
+    """
+    return _RENEW_SCRIPT % {
+        "shard": _SHARD_MARKER,
+        "shards": _SHARDS_MARKER,
+        "start": _START_MARKER,
+        "job": _JOB_MARKER,
+        "done": _DONE_MARKER,
+        "dry_run": dry_run,
+        "age_filter": f"-amin +{older_than * 24 * 60}" if older_than > 0 else "",
+        "progress": progress or "",
+        "workers": workers,
+    }
+
+
+def parse_shard_line(line: str) -> ShardProgress | None:
+    """Parse a shard report line of the renewal script, or return None for any other line."""
+    if not line.startswith(f"{_SHARD_MARKER} "):
+        return None
+    fields = line.split(" ", 5)
+    if len(fields) < 5:
+        return None
+    path = fields[5] if len(fields) > 5 else ""
+    return ShardProgress(
+        "$SCRATCH (top-level files)" if path == "." else path,
+        int(fields[1]),
+        int(fields[2]),
+        int(fields[3]) / 1000,
+        int(fields[4]),
+    )
+
+
+@dataclass
+class RenewProgress:
+    """State of the checkpointed renewal, read back from its progress file."""
+
+    started: float | None = None
+    updated: float | None = None
+    finished: float | None = None
+    job_ids: list[str] = field(default_factory=list)
+    total_shards: int = 0
+    shards: dict[str, ShardProgress] = field(default_factory=dict)
+
+    @property
+    def done_shards(self) -> int:
+        """Number of shards that finished successfully."""
+        return sum(1 for shard in self.shards.values() if shard.returncode == 0)
+
+
+def parse_progress(text: str, updated: float | None = None) -> RenewProgress:
+    """Parse the progress file written by a checkpointed renewal."""
+    progress = RenewProgress(updated=updated)
+    for line in text.splitlines():
+        marker, _, rest = line.partition(" ")
+        fields = rest.split()
+        if marker == _START_MARKER and fields:
+            progress.started = float(fields[0])
+        elif marker == _JOB_MARKER and fields:
+            progress.job_ids.append(fields[0])
+        elif marker == _SHARDS_MARKER and fields:
+            progress.total_shards = int(fields[0])
+        elif marker == _DONE_MARKER and fields:
+            progress.finished = float(fields[0])
+        elif (shard := parse_shard_line(line)) is not None:
+            # A shard retried after a failure reports again; keep its latest outcome
+            progress.shards[shard.path] = shard
+    return progress
+
+
+def _submit_renew_job(workers: int, older_than: int, time: str) -> None:
+    """Render the checkpointed renewal as a CPU job and submit it."""
+    resources = CPUResource(cpus_per_task=workers)
+    remote_dir = Path(get_remote_fact("scratch")) / ".jz"
+    sbatch_script = render_sbatch_script(
+        JOB_NAME,
+        time,
+        "nomultithread",
+        f"#SBATCH --ntasks=1\n{resources.to_sbatch()}",
+        renew_script(workers, older_than, progress=PROGRESS_FILE),
+        output=f"{remote_dir}/renew_%j.out",
+        error=f"{remote_dir}/renew_%j.err",
+    )
+    upload_sbatch_script(sbatch_script, remote_dir, submit=True, prefix="renew")
+    typer.echo("Follow its progress with `jz scratch status`; submitting again resumes an interrupted renewal.")
+
+
+@app.command()
+def renew(
+    workers: int = typer.Option(
+        DEFAULT_WORKERS, "--workers", "-w", min=1, help="Number of shards renewed in parallel."
+    ),
+    older_than: int = typer.Option(
+        0, "--older-than", min=0, help="Only touch entries not accessed for more than this many days (0: all)."
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only count the entries that would be renewed."),
+    as_job: bool = typer.Option(
+        False, "--as-job", help="Submit a resumable renewal as a CPU job instead of running it on the login node."
+    ),
+    time: str = typer.Option("20:00:00", "--time", help="Time limit of the job (with --as-job)"),
+) -> None:
+    """Refresh file and directory timestamps under remote $SCRATCH."""
+    if as_job:
+        if dry_run:
+            typer.echo("❌ --dry-run cannot be combined with --as-job.")
+            raise typer.Exit(1)
+        _submit_renew_job(workers, older_than, time)
+        return
+
+    console = Console(highlight=False)
+    err_console = Console(stderr=True, highlight=False)
+    total_shards, results = 0, []
+    verb = "would renew" if dry_run else "renewed"
+    returncode = 0
+    try:
+        with console.status("Renewing timestamps under $SCRATCH...") as status:
+            for name, line in stream(renew_script(workers, older_than, dry_run), login_shell=True):
+                if name == "stdout" and line.startswith(f"{_SHARDS_MARKER} "):
+                    total_shards = int(line.split()[1])
+                    continue
+                shard = parse_shard_line(line) if name == "stdout" else None
+                if shard is None:
+                    (err_console if name == "stderr" else console).print(line, markup=False, soft_wrap=True)
+                    continue
+                results.append(shard)
+                mark = "✅" if shard.returncode == 0 else "❌"
+                console.print(
+                    f"{mark} {shard.path}: scanned {shard.scanned:,}, {verb} {shard.touched:,} in {shard.elapsed:.1f}s",
+                    markup=False,
+                )
+                status.update(
+                    f"Renewing timestamps under $SCRATCH... {len(results)}/{total_shards or '?'} shards, "
+                    f"{sum(r.touched for r in results):,} {verb}"
+                )
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+    if results:
+        console.print(
+            f"{'Would renew' if dry_run else 'Renewed'} {sum(r.touched for r in results):,} of "
+            f"{sum(r.scanned for r in results):,} entries scanned in {len(results)} shard(s).",
+            markup=False,
+        )
+    if returncode:
+        raise typer.Exit(returncode)
+
+
+@app.command()
+def status() -> None:
+    """Show how far the last `jz scratch renew --as-job` got."""
+    results = run_batch(
+        [f'stat -c %Y "{PROGRESS_FILE}" && cat "{PROGRESS_FILE}"', f'squeue -h -u "$USER" -n {JOB_NAME} -o "%i %T %M"'],
+        login_shell=True,
+    )
+    if not results[0].ok:
+        typer.echo("No checkpointed renewal has run yet (see `jz scratch renew --as-job`).")
+        return
+    updated, _, text = results[0].stdout.partition("\n")
+    progress = parse_progress(text, updated=float(updated))
+
+    def when(timestamp: float | None) -> str:
+        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "?"  # noqa: DTZ006
+
+    shards = progress.shards.values()
+    failed = sum(1 for shard in shards if shard.returncode != 0)
+    typer.echo(f"Started:  {when(progress.started)} (job {', '.join(progress.job_ids) or '?'})")
+    typer.echo(f"Updated:  {when(progress.updated)}")
+    typer.echo(
+        f"Shards:   {progress.done_shards}/{progress.total_shards or '?'} finished"
+        + (f", {failed} failed" if failed else "")
+    )
+    typer.echo(f"Entries:  {sum(s.touched for s in shards):,} renewed of {sum(s.scanned for s in shards):,} scanned")
+    jobs = results[1].stdout.strip() if results[1].ok else ""
+    if progress.finished:
+        typer.echo(f"✅ Completed at {when(progress.finished)}")
+    elif jobs:
+        typer.echo(f"⏳ Job queued or running: {jobs}")
+    else:
+        typer.echo("⚠️  Incomplete and no job is queued; run `jz scratch renew --as-job` to resume.")
@@ -2,43 +2,331 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import base64
+import contextlib
+import gzip
+import itertools
+import json
+import re
+import shlex
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable
 
 import typer
+from rich import box
 from rich import print as rprint
-from rich.syntax import Syntax
+from rich.console import Console
+from rich.table import Table
 
+from jz_cli import cache, trace
 from jz_cli.config import get_value
-from jz_cli.ssh import run
-from jz_cli.sync import get_remote_base_dir
+from jz_cli.remote import get_rsync_base_dir
+from jz_cli.ssh import get_remote_user, run, run_batch, run_live, session, stream
 
 app = typer.Typer(help="SLURM-specific commands.")
 
 
+_NODE_MARKER = "__JZ_NODE__"
+DEFAULT_NODE_TIMEOUT = 300
+
+
+@dataclass
+class NodeResult:
+    """Outcome of a fanned-out command on one node."""
+
+    node: str
+    returncode: int
+    elapsed: float
+
+    @property
+    def timed_out(self) -> bool:
+        """Whether `timeout` stopped the command (exit 124, or 137 once it had to kill it)."""
+        return self.returncode in (124, 137)
+
+
+def fan_out_script(job_id: int, command: str, nodes: str | None = None, timeout: int = DEFAULT_NODE_TIMEOUT) -> str:
+    """Build a remote script running `command` on every node of the job (or the `nodes` hostlist) at once.
+
+    Output lines are prefixed with `[node] `; each node ends with a `_NODE_MARKER node exit elapsed_ms` line.
+    """
+    hostlist = shlex.quote(nodes) if nodes else f'"$(squeue -h -j {job_id} -o %N)"'
+    limit = f"timeout -k 5 {timeout} " if timeout > 0 else ""
+    return f"""
+nodes=$(scontrol show hostnames {hostlist})
+if [ -z "$nodes" ]; then
+  echo "ERROR: no nodes allocated to job {job_id}." >&2
+  exit 1
+fi
+for node in $nodes; do
+  (
+    start=$(date +%s%N)
+    {limit}srun --jobid {job_id} --overlap --nodes=1 --ntasks=1 -w "$node" {command} 2>&1 </dev/null \\
+      | sed -u "s/^/[$node] /"
+    rc=${{PIPESTATUS[0]}}
+    echo "{_NODE_MARKER} $node $rc $(( ($(date +%s%N) - start) / 1000000 ))"
+  ) &
+done
+wait
+"""
+
+
+def _print_node_summary(results: list[NodeResult]) -> None:
+    table = Table("Node", "Exit", "Time", box=box.MINIMAL)
+    for result in sorted(results, key=lambda r: r.node):
+        status = "⏱  timeout" if result.timed_out else ("✅ 0" if result.returncode == 0 else f"❌ {result.returncode}")
+        table.add_row(result.node, status, f"{result.elapsed:.1f}s")
+    Console().print(table)
+
+
 @app.command(context_settings={"ignore_unknown_options": True, "allow_extra_args": True})
 def node_run(
     job_id: int | None = typer.Argument(..., help="Job ID to run command on"),
     command: str = typer.Argument(..., help="Command to run on the allocated node"),
+    all_nodes: bool = typer.Option(False, "--all-nodes", "-a", help="Run the command on every node of the job at once"),
+    nodes: str = typer.Option(None, "--nodes", "-w", help="Run on these nodes of the job at once (SLURM hostlist)"),
+    timeout: int = typer.Option(
+        DEFAULT_NODE_TIMEOUT,
+        "--timeout",
+        min=0,
+        help="Per-node time limit in seconds with --all-nodes/--nodes (0: none)",
+    ),
 ) -> None:
     """Run command on allocated node based on job id. (accepts any srun options)."""
-    cmd = f"srun --jobid {job_id} --overlap --ntasks=1 {command}"
-    typer.echo(run(cmd, login_shell=True))
+    if not all_nodes and not nodes:
+        cmd = f"srun --jobid {job_id} --overlap --ntasks=1 {command}"
+        run_live(cmd, login_shell=True)
+        return
+
+    console = Console(highlight=False)
+    err_console = Console(stderr=True, highlight=False)
+    results: list[NodeResult] = []
+    try:
+        for name, line in stream(fan_out_script(job_id, command, nodes, timeout), login_shell=True):
+            if name == "stdout" and line.startswith(f"{_NODE_MARKER} "):
+                _, node, returncode, elapsed = line.split()
+                results.append(NodeResult(node, int(returncode), int(elapsed) / 1000))
+                continue
+            (err_console if name == "stderr" else console).print(line, markup=False, soft_wrap=True)
+    except subprocess.CalledProcessError as e:
+        raise typer.Exit(e.returncode) from e
+    _print_node_summary(results)
+    if any(result.returncode != 0 for result in results):
+        raise typer.Exit(1)
+
+
+# `|`-separated squeue fields; the job name goes last since it is the only one that may contain the separator
+_SQUEUE_FORMAT = "%i|%P|%T|%M|%L|%D|%b|%N|%r|%j"
+_SQUEUE_FIELDS = 10
+DEFAULT_WATCH_INTERVAL = 5.0
+MAX_WATCH_INTERVAL = 60.0
+
+
+@dataclass
+class JobRecord:
+    """One job of the SLURM queue, as reported by `squeue`."""
+
+    job_id: str
+    partition: str
+    state: str
+    time_used: str
+    time_left: str
+    nodes: int
+    gres: str
+    nodelist: str
+    reason: str
+    name: str
+
+    @classmethod
+    def from_squeue_line(cls, line: str) -> JobRecord:
+        """Parse one line of `squeue -o _SQUEUE_FORMAT` output."""
+        fields = line.split("|", _SQUEUE_FIELDS - 1)
+        if len(fields) != _SQUEUE_FIELDS:
+            msg = f"Unexpected squeue line: {line!r}"
+            raise ValueError(msg)
+        job_id, partition, state, time_used, time_left, nodes, gres, nodelist, reason, name = fields
+        return cls(job_id, partition, state, time_used, time_left, int(nodes or 0), gres, nodelist, reason, name)
+
+
+def get_jobs(squeue_args: list[str] | None = None) -> list[JobRecord]:
+    """Return the user's jobs as parsed records (`squeue_args` are passed on to `squeue`, except `-o`)."""
+    cmd = f'squeue -h -u $USER -o "{_SQUEUE_FORMAT}" ' + " ".join(squeue_args or [])
+    output = run(cmd, login_shell=True)
+    return [JobRecord.from_squeue_line(line) for line in output.splitlines() if line.strip()]
+
+
+def _jobs_table(jobs: list[JobRecord], changed: set[str] | frozenset[str] = frozenset()) -> Table:
+    """Render jobs as a table; rows of the jobs in `changed` are highlighted."""
+    table = Table(
+        "Job ID", "Partition", "Name", "State", "Used", "Left", "Nodes", "GRES", "Nodelist (reason)", box=box.MINIMAL
+    )
+    for job in jobs:
+        table.add_row(
+            job.job_id,
+            job.partition,
+            job.name,
+            job.state,
+            job.time_used,
+            job.time_left,
+            str(job.nodes),
+            job.gres,
+            job.nodelist if job.state == "RUNNING" else f"({job.reason})",
+            style="bold" if job.job_id in changed else None,
+        )
+    return table
+
+
+def _watch_queue(squeue_args: list[str], interval: float) -> None:
+    """Redraw the queue whenever it changes, polling more slowly while it does not."""
+    from rich.live import Live  # noqa: PLC0415
+
+    previous: dict[str, JobRecord] | None = None
+    delay = interval
+    # One agent for the whole watch: each poll is a request over it rather than a new ssh process and login shell
+    with session(), Live(auto_refresh=False) as live:
+        while True:
+            jobs = get_jobs(squeue_args)
+            current = {job.job_id: job for job in jobs}
+            if previous is None:
+                live.update(_jobs_table(jobs), refresh=True)
+            elif current != previous:
+                changed = {job_id for job_id, job in current.items() if previous.get(job_id) != job}
+                live.update(_jobs_table(jobs, changed), refresh=True)
+                delay = interval
+            else:
+                delay = min(delay * 2, MAX_WATCH_INTERVAL)
+            previous = current
+            time.sleep(delay)
 
 
 @app.command(context_settings={"ignore_unknown_options": True, "allow_extra_args": True})
-def queue(ctx: typer.Context) -> None:
-    """Show job queue for user. (accepts any squeue options)."""
-    cmd = 'squeue -u $USER -o "%10i %9P %16j %2t %10M %10L %5D %15b %14N %R"' + " " + " ".join(ctx.args)
-    typer.echo(run(cmd, login_shell=True))
+def queue(
+    ctx: typer.Context,
+    as_json: bool = typer.Option(False, "--json", help="Print the jobs as JSON records"),
+    watch: bool = typer.Option(False, "--watch", "-w", help="Keep the table up to date (Ctrl+C to stop)"),
+    interval: float = typer.Option(
+        DEFAULT_WATCH_INTERVAL, "--interval", min=1.0, help="Polling interval of --watch, backing off while idle"
+    ),
+) -> None:
+    """Show job queue for user. (accepts any squeue options except -o)."""
+    if watch:
+        with contextlib.suppress(KeyboardInterrupt):
+            _watch_queue(ctx.args, interval)
+        return
+    jobs = get_jobs(ctx.args)
+    if as_json:
+        typer.echo(json.dumps([asdict(job) for job in jobs], indent=2))
+        return
+    Console().print(_jobs_table(jobs))
+
+
+_SINFO_CMD = 'sinfo -h -o "%P|%a|%l|%D|%F|%G|%f"'
+_SINFO_FIELDS = 7
+DEFAULT_SINFO_TTL = 300
+_CLUSTER_CACHE = "cluster-state"
+
+
+@dataclass
+class PartitionState:
+    """Availability of one group of nodes (partition and feature set), as reported by `sinfo`."""
+
+    partition: str
+    available: str
+    time_limit: str
+    nodes_allocated: int
+    nodes_idle: int
+    nodes_other: int
+    nodes_total: int
+    gres: str
+    features: list[str]
+
+    @classmethod
+    def from_sinfo_line(cls, line: str) -> PartitionState:
+        """Parse one line of `sinfo -o _SINFO_CMD` output."""
+        fields = line.split("|")
+        if len(fields) != _SINFO_FIELDS:
+            msg = f"Unexpected sinfo line: {line!r}"
+            raise ValueError(msg)
+        partition, available, time_limit, _, counts, gres, features = fields
+        allocated, idle, other, total = (int(n) for n in counts.split("/"))
+        return cls(
+            partition.rstrip("*"),
+            available,
+            time_limit,
+            allocated,
+            idle,
+            other,
+            total,
+            gres,
+            [f for f in features.split(",") if f and f != "(null)"],
+        )
+
+    @property
+    def gpus_per_node(self) -> int:
+        """GPUs per node according to the GRES column (`gpu:8(S:0-1)` or `gpu:a100:8`), 0 without GPUs."""
+        match = re.search(r"gpu:(?:[^:,(]+:)?(\d+)", self.gres)
+        return int(match.group(1)) if match else 0
+
+
+def _sinfo_ttl() -> float:
+    value = get_value("sinfo_ttl")
+    return float(value) if value else DEFAULT_SINFO_TTL
+
+
+def _parse_sinfo(output: str) -> list[PartitionState]:
+    return [PartitionState.from_sinfo_line(line) for line in output.splitlines() if line.strip()]
+
+
+def _store_cluster_state(states: list[PartitionState]) -> None:
+    cache.store(_CLUSTER_CACHE, [asdict(state) for state in states])
+
+
+def _cached_cluster_state() -> list[PartitionState] | None:
+    data = cache.load(_CLUSTER_CACHE, ttl=_sinfo_ttl())
+    return None if data is None else [PartitionState(**state) for state in data]
+
+
+def get_cluster_state(refresh: bool = False) -> list[PartitionState]:
+    """Return the partition availability snapshot, re-reading `sinfo` once older than `sinfo_ttl` seconds."""
+    states = None if refresh else _cached_cluster_state()
+    if states is None:
+        states = _parse_sinfo(run(_SINFO_CMD, login_shell=True))
+        _store_cluster_state(states)
+    return states
 
 
 @app.command(context_settings={"ignore_unknown_options": True, "allow_extra_args": True})
-def info(ctx: typer.Context) -> None:
-    """Show cluster info. (accepts any sinfo options)."""
-    cmd = 'sinfo -O "Partition:15,Available:12,Time:15,NodeAIOT,GRES,Features:35"' + " ".join(ctx.args)
-    typer.echo(run(cmd, login_shell=True))
+def info(
+    ctx: typer.Context,
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore the cached snapshot and query sinfo again"),
+    as_json: bool = typer.Option(False, "--json", help="Print the partitions as JSON records"),
+) -> None:
+    """Show cluster info. (extra sinfo options bypass the cached snapshot)."""
+    if ctx.args:
+        cmd = 'sinfo -O "Partition:15,Available:12,Time:15,NodeAIOT,GRES,Features:35" ' + " ".join(ctx.args)
+        typer.echo(run(cmd, login_shell=True))
+        return
+    states = get_cluster_state(refresh=refresh)
+    if as_json:
+        typer.echo(json.dumps([asdict(state) for state in states], indent=2))
+        return
+    table = Table("Partition", "Avail", "Time limit", "Nodes (A/I/O/T)", "GRES", "Features", box=box.MINIMAL)
+    for state in states:
+        table.add_row(
+            state.partition,
+            state.available,
+            state.time_limit,
+            f"{state.nodes_allocated}/{state.nodes_idle}/{state.nodes_other}/{state.nodes_total}",
+            state.gres,
+            ",".join(state.features),
+        )
+    Console().print(table)
+    age = cache.age(_CLUSTER_CACHE)
+    if age is not None and age >= 1:
+        typer.echo(f"(snapshot from {age:.0f}s ago, use --refresh to update)")
 
 
 @app.command(context_settings={"ignore_unknown_options": True, "allow_extra_args": True})
@@ -157,40 +445,159 @@ class V100Resource(GPUResource):
             self.max_gpus = 4
 
 
-@app.command()
-def batch(
-    job_name: str = typer.Option("", "--job-name", help="Job name"),
-    time: str = typer.Option("02:00:00", "--time", help="Time limit"),
-    hint: str = typer.Option("nomultithread", "--hint", help="Hint for the job"),
-    num_of_gpus: int = typer.Option(1, "--num-of-gpus", help="Number of GPUs"),
-    module_load: list[str] = typer.Option([], "--module-load", help="Modules to load (can repeat)"),
-    script: str = typer.Option(None, "--script", help="Script to run"),
-    gpu_type: str = typer.Option("v100-32g", "--gpu-type", help="GPU type (a100, h100, v100-p2, v100-16g, v100-32g)"),
-    spawn_workers_with_slurm: bool = typer.Option(
-        False,
-        "--spawn-workers-with-slurm/--no-spawn-workers-with-slurm",
-        help=(
-            "Let Slurm spawn one worker task per GPU. Disable this when the script uses "
-            "a launcher like torchrun, accelerate, or deepspeed to spawn GPU workers."
-        ),
-    ),
-    submit_job: bool = typer.Option(False, "--submit-job", help="Submit the job to the cluster"),
-) -> None:
-    """Create a SLURM sbatch script."""
-    if gpu_type == "a100":
-        partition = A100Resource()
-    elif gpu_type == "h100":
-        partition = H100Resource()
-    elif gpu_type == "v100-p2":
-        partition = V100Resource(partition="gpu_p2")
-    elif gpu_type == "v100-16g":
-        partition = V100Resource(gpu_mem=16)
-    elif gpu_type == "v100-32g":
-        partition = V100Resource(gpu_mem=32)
-    else:
+@dataclass
+class CPUResource(GPUResource):
+    """CPU partition resource specifications."""
+
+    partition: str = field(init=False, default="cpu_p1")
+    cpus_per_task: int = 1
+
+    def __post_init__(self) -> None:
+        """Set account after initialization."""
+        account = get_value("account")
+        self.account = f"{account}@cpu" if account else ""
+
+
+GPU_TYPES = {
+    "a100": A100Resource,
+    "h100": H100Resource,
+    "v100-p2": lambda: V100Resource(partition="gpu_p2"),
+    "v100-16g": lambda: V100Resource(gpu_mem=16),
+    "v100-32g": lambda: V100Resource(gpu_mem=32),
+}
+
+
+def get_gpu_resource(gpu_type: str) -> GPUResource:
+    """Return the resource specification for a `--gpu-type` value."""
+    if gpu_type not in GPU_TYPES:
         msg = f"Invalid gpu_type: {gpu_type}"
         raise ValueError(msg)
+    return GPU_TYPES[gpu_type]()
+
+
+def render_sbatch_script(
+    job_name: str,
+    time: str,
+    hint: str,
+    resources: str,
+    body: str,
+    module_load_cmd: str = "",
+    output: str = "job_logs/%x_%j.out",
+    error: str = "job_logs/%x_%j.err",
+) -> str:
+    """Render an sbatch script from its resource directives and the commands to run."""
+    return f"""#!/bin/bash
+#SBATCH --job-name={job_name}             # Name of job
+#SBATCH --time={time}                     # maximum execution time requested (HH:MM:SS)
+#SBATCH --hint={hint}
+#SBATCH --output={output}       # name of output file
+#SBATCH --error={error}        # name of error file
+{resources}
+
+# Cleans out the modules loaded in interactive and inherited by default
+module purge
+{module_load_cmd}
+
+{body}
+"""
+
+
+def upload_sbatch_script(
+    sbatch_script: str,
+    remote_dir: Path,
+    submit: bool = False,
+    prefix: str = "sbatch",
+    confirm: bool = True,
+    name: str | None = None,
+    files: dict[Path, str] | None = None,
+    sbatch_args: str = "",
+) -> str | None:
+    """Show the script, write it to `remote_dir` on jz and optionally submit it, in a single round trip.
+
+    The script is saved as `<name>.slurm` (default: `<prefix>_<timestamp>`). `files` maps further remote paths to
+    contents that are written in the same round trip, gzip-compressed on the wire. Returns the job ID when the job was
+    submitted.
+    """
+    if confirm:
+        from rich.syntax import Syntax  # noqa: PLC0415
+
+        rprint(Syntax(sbatch_script, "bash", line_numbers=True))
+        typer.confirm("Is the above SBATCH script correct?", abort=True)
+
+    # Create file in jz with timestamp, make sure it exists and (optionally) submit it, all in one round trip
+    filepath = remote_dir / f"{name or script_name(prefix)}.slurm"
+    cmd_submit = f"sbatch --parsable {sbatch_args + ' ' if sbatch_args else ''}{filepath}"
+    # Quoted delimiter: `$VARS` in the script are expanded when the job runs, not when the file is written
+    cmds = [f"mkdir -p {remote_dir}", f"cat > {filepath} <<'__JZ_EOF__'\n{sbatch_script}\n__JZ_EOF__"]
+    upload_cmds, payload = _upload_commands(files or {})
+    cmds += upload_cmds
+    cmds.append(" && ".join(f"test -f {path}" for path in [filepath, *(files or {})]))
+    if submit:
+        cmds.append(cmd_submit)
+    with trace.span("slurm.upload_submit" if submit else "slurm.upload", files=1 + len(files or {})):
+        results = run_batch(cmds, login_shell=True, stop_on_failure=True, input=payload)
+    check, submission = results[len(files or {}) + 2], results[-1]
+
+    if not check.ok:
+        typer.echo("❌ Failed to create file.")
+        raise typer.Exit(1)
+    typer.echo(f"✅ File created at {filepath}")
 
+    if not submit:
+        return None
+    typer.echo(f"Submitting job to cluster with command:\n{cmd_submit}")
+    if not submission.ok:
+        typer.echo(f"❌ Submission failed:\n{submission.stderr.strip()}")
+        raise typer.Exit(1)
+    job_id = parse_job_id(submission.stdout)
+    typer.echo(f"✅ Submitted batch job {job_id}")
+    return job_id
+
+
+def _upload_commands(files: dict[Path, str]) -> tuple[list[str], str]:
+    """Remote commands writing each content of `files` to its path, and the `run_batch` input they read them from.
+
+    Contents are gzip-compressed and base64-encoded, and go over stdin rather than into the command line, whose
+    arguments are limited to 128 KiB each.
+    """
+    cmds, payloads = [], []
+    for path, content in files.items():
+        encoded = base64.b64encode(gzip.compress(content.encode())).decode()
+        cmds.append(f"head -c {len(encoded)} <&3 | base64 -d | gunzip > {path}")
+        payloads.append(encoded)
+    return cmds, "".join(payloads)
+
+
+def parse_job_id(sbatch_output: str) -> str:
+    """Extract the job ID from `sbatch` output (`--parsable` `<id>[;cluster]` or `Submitted batch job <id>`)."""
+    last = sbatch_output.strip().splitlines()[-1] if sbatch_output.strip() else ""
+    return last.split(";")[0].split()[-1] if last else ""
+
+
+def script_name(prefix: str = "sbatch") -> str:
+    """Return a timestamped name for a script uploaded to jz."""
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d%H%M%S')}"  # noqa: DTZ005
+
+
+def gpu_sbatch_script(
+    partition: GPUResource,
+    job_name: str,
+    time: str,
+    hint: str,
+    num_of_gpus: int,
+    module_load: list[str],
+    script: str,
+    spawn_workers_with_slurm: bool,
+    remote_dir: Path,
+    preamble: str = "",
+    log_name: str = "%x_%j",
+    directives: str = "",
+) -> str:
+    """Render the sbatch script of `jz slurm batch` for one GPU resource.
+
+    `preamble` runs in the remote directory right before `srun`; `log_name` is the SLURM pattern of the log files and
+    `directives` are extra `#SBATCH` lines.
+    """
     module_load_cmd = ""
     if module_load:
         module_load = ([partition.module_load] if partition.module_load else []) + module_load
@@ -209,52 +616,622 @@ def batch(
         ntasks_comment = "total number of launcher tasks (= one per node)"
         ntasks_per_node_comment = "one launcher task per node; script spawns GPU workers"
 
-    sbatch_script = f"""#!/bin/bash
-#SBATCH --job-name={job_name}             # Name of job
-#SBATCH --time={time}                     # maximum execution time requested (HH:MM:SS)
-#SBATCH --hint={hint}
-#SBATCH --output=job_logs/%x_%j.out       # name of output file
-#SBATCH --error=job_logs/%x_%j.err        # name of error file
-#SBATCH --ntasks={ntasks}                 # {ntasks_comment}
+    resources = f"""#SBATCH --ntasks={ntasks}                 # {ntasks_comment}
 #SBATCH --gres=gpu:{gpus_per_node}        # number of GPUs per node (max 8 with gpu_p2, gpu_p5)
 #SBATCH --ntasks-per-node={ntasks_per_node} # {ntasks_per_node_comment}
 #SBATCH --nodes={num_of_nodes}            # number of nodes
-{partition.to_sbatch()}
+{directives}{partition.to_sbatch()}"""
+    body = f"""cd {remote_dir}
+{preamble}
+# Echo of launched commands
+set -x
 
-# Cleans out the modules loaded in interactive and inherited by default
-module purge
-{module_load_cmd}
+srun {script}"""
+    return render_sbatch_script(
+        job_name,
+        time,
+        hint,
+        resources,
+        body,
+        module_load_cmd,
+        output=f"job_logs/{log_name}.out",
+        error=f"job_logs/{log_name}.err",
+    )
 
-cd {get_remote_base_dir(Path.cwd())}
 
-# Echo of launched commands
-set -x
+@dataclass
+class StartEstimate:
+    """Estimated start of a job on one GPU type, from `sbatch --test-only`."""
 
-srun {script}
-"""
+    gpu_type: str
+    partition: str
+    start: datetime | None = None
+    error: str = ""
 
-    # Confirm SBATCH script
-    rprint(Syntax(sbatch_script, "bash", line_numbers=True))
-    typer.confirm("Is the above SBATCH script correct?", abort=True)
 
-    # Create file in jz with timestamp
-    current_datetime = str(datetime.now().strftime("%Y%m%d%H%M%S"))  # noqa: DTZ005
-    filepath = get_remote_base_dir(Path.cwd()) / f"sbatch_{current_datetime}.slurm"
-    run(f"cat > {filepath} <<EOF\n{sbatch_script}\nEOF")
+def _partition_gpus(states: list[PartitionState], resource: GPUResource) -> int:
+    """Total GPUs of the nodes matching `resource` (partition and constraint) in a sinfo snapshot."""
+    return sum(
+        state.nodes_total * state.gpus_per_node
+        for state in states
+        if state.partition == resource.partition and (not resource.constraint or resource.constraint in state.features)
+    )
 
-    # Make sure the file exists
-    cmd_check_file = f"""
-if [ -f {filepath} ]; then
-  echo "success"
-fi
+
+def estimate_start_times(scripts: dict[str, str], num_of_gpus: int) -> list[StartEstimate]:
+    """Ask SLURM when each GPU type's script would start, skipping types without enough GPUs.
+
+    A stale sinfo snapshot is refreshed in the same round trip as the `sbatch --test-only` calls.
+    """
+    states = _cached_cluster_state()
+    resources = {name: get_gpu_resource(name) for name in scripts}
+    if states is not None:
+        resources = {name: r for name, r in resources.items() if _partition_gpus(states, r) >= num_of_gpus}
+    cmds = [_SINFO_CMD if states is None else ":"]
+    cmds += [f"sbatch --test-only <<'__JZ_EOF__'\n{scripts[name]}\n__JZ_EOF__" for name in resources]
+    results = run_batch(cmds, login_shell=True)
+    if states is None:
+        states = _parse_sinfo(results[0].stdout)
+        _store_cluster_state(states)
+
+    estimates = []
+    for name, result in zip(resources, results[1:]):
+        resource = resources[name]
+        if _partition_gpus(states, resource) < num_of_gpus:
+            continue
+        # sbatch reports "Job N to start at 2024-01-01T10:00:00 using ... in partition P" on stderr
+        match = re.search(r"to start at (\S+)", result.stderr + result.stdout)
+        if result.ok and match:
+            estimates.append(StartEstimate(name, resource.partition, datetime.fromisoformat(match.group(1))))
+        else:
+            error = (result.stderr or result.stdout).strip().splitlines()
+            estimates.append(StartEstimate(name, resource.partition, error=error[-1] if error else "no estimate"))
+    return estimates
+
+
+def print_start_estimates(estimates: list[StartEstimate]) -> None:
+    """Print the estimated start of each GPU type."""
+    table = Table("GPU type", "Partition", "Estimated start", box=box.MINIMAL)
+    for estimate in sorted(estimates, key=lambda e: (e.start is None, e.start.isoformat() if e.start else "")):
+        table.add_row(
+            estimate.gpu_type, estimate.partition, str(estimate.start) if estimate.start else f"❌ {estimate.error}"
+        )
+    Console().print(table)
+
+
+def pick_gpu_type(render: Callable[[str], str], num_of_gpus: int) -> str:
+    """Return the GPU type whose script (`render(gpu_type)`) has the earliest estimated start; exit if none can run."""
+    estimates = estimate_start_times({name: render(name) for name in GPU_TYPES}, num_of_gpus)
+    print_start_estimates(estimates)
+    startable = [e for e in estimates if e.start is not None]
+    if not startable:
+        typer.echo("❌ No GPU type can run this job; pick one with --gpu-type.")
+        raise typer.Exit(1)
+    gpu_type = min(startable, key=lambda e: e.start).gpu_type
+    typer.echo(f"✅ Using --gpu-type {gpu_type} (earliest estimated start)")
+    return gpu_type
+
+
+@app.command()
+def batch(
+    job_name: str = typer.Option("", "--job-name", help="Job name"),
+    time: str = typer.Option("02:00:00", "--time", help="Time limit"),
+    hint: str = typer.Option("nomultithread", "--hint", help="Hint for the job"),
+    num_of_gpus: int = typer.Option(1, "--num-of-gpus", help="Number of GPUs"),
+    module_load: list[str] = typer.Option([], "--module-load", help="Modules to load (can repeat)"),
+    script: str = typer.Option(None, "--script", help="Script to run"),
+    gpu_type: str = typer.Option(
+        "v100-32g",
+        "--gpu-type",
+        help="GPU type (a100, h100, v100-p2, v100-16g, v100-32g, or auto for the earliest estimated start)",
+    ),
+    spawn_workers_with_slurm: bool = typer.Option(
+        False,
+        "--spawn-workers-with-slurm/--no-spawn-workers-with-slurm",
+        help=(
+            "Let Slurm spawn one worker task per GPU. Disable this when the script uses "
+            "a launcher like torchrun, accelerate, or deepspeed to spawn GPU workers."
+        ),
+    ),
+    submit_job: bool = typer.Option(False, "--submit-job", help="Submit the job to the cluster"),
+) -> None:
+    """Create a SLURM sbatch script."""
+    with trace.span("slurm.batch.remote_dir"):
+        remote_dir = get_rsync_base_dir(Path.cwd())
+
+    def render(gpu_type: str) -> str:
+        return gpu_sbatch_script(
+            get_gpu_resource(gpu_type),
+            job_name,
+            time,
+            hint,
+            num_of_gpus,
+            module_load,
+            script,
+            spawn_workers_with_slurm,
+            remote_dir,
+        )
+
+    if gpu_type == "auto":
+        with trace.span("slurm.batch.pick_gpu_type"):
+            gpu_type = pick_gpu_type(render, num_of_gpus)
+    with trace.span("slurm.batch.render"):
+        sbatch_script = render(gpu_type)
+    upload_sbatch_script(sbatch_script, remote_dir, submit=submit_job)
+
+
+def load_spec_file(path: Path) -> Any:
+    """Load a JSON or (with PyYAML installed) YAML file."""
+    text = path.read_text()
+    if path.suffix not in (".yaml", ".yml"):
+        return json.loads(text)
+    try:
+        import yaml  # noqa: PLC0415
+    except ImportError:
+        typer.echo(f"❌ Reading {path} requires PyYAML (`pip install pyyaml`); use a JSON file instead.")
+        raise typer.Exit(1) from None
+    return yaml.safe_load(text)
+
+
+def parse_grid(params: list[str], grid_file: Path | None = None) -> list[dict[str, str]]:
+    """Expand `--param name=v1,v2` options and/or a JSON/YAML grid file into the list of sweep points.
+
+    A grid file holds either a mapping of parameter names to value lists (expanded as a cartesian product) or a list of
+    explicit points. `--param` values are crossed with the file's points.
+    """
+    points: list[dict[str, str]] = [{}]
+    if grid_file is not None:
+        data = load_spec_file(grid_file)
+        if isinstance(data, dict):
+            points = [dict(zip(data, values)) for values in itertools.product(*data.values())]
+        else:
+            points = list(data)
+    axes = {}
+    for param in params:
+        key, sep, values = param.partition("=")
+        if not sep or not key:
+            msg = f"Invalid --param {param!r}, expected name=value1,value2,..."
+            raise typer.BadParameter(msg)
+        axes[key] = values.split(",")
+    for key, values in axes.items():
+        points = [{**point, key: value} for point in points for value in values]
+    return [{key: str(value) for key, value in point.items()} for point in points]
+
+
+def sweep_args(points: list[dict[str, str]]) -> str:
+    """Render the arguments of each sweep point as one shell-quoted `--name=value ...` line."""
+    return "".join(shlex.join(f"--{key}={value}" for key, value in point.items()) + "\n" for point in points)
+
+
+@app.command()
+def sweep(
+    params: list[str] = typer.Option([], "--param", "-p", help="Swept parameter as name=v1,v2,... (can repeat)"),
+    grid: Path | None = typer.Option(
+        None, "--grid", help="JSON or YAML grid file (mapping of lists, or list of points)"
+    ),
+    max_concurrent: int = typer.Option(0, "--max-concurrent", min=0, help="Run at most N tasks at once (0: no cap)"),
+    job_name: str = typer.Option("", "--job-name", help="Job name"),
+    time: str = typer.Option("02:00:00", "--time", help="Time limit of each task"),
+    hint: str = typer.Option("nomultithread", "--hint", help="Hint for the job"),
+    num_of_gpus: int = typer.Option(1, "--num-of-gpus", help="Number of GPUs of each task"),
+    module_load: list[str] = typer.Option([], "--module-load", help="Modules to load (can repeat)"),
+    script: str = typer.Option(None, "--script", help="Script to run; each task appends its --name=value arguments"),
+    gpu_type: str = typer.Option("v100-32g", "--gpu-type", help="GPU type (see `jz slurm batch --help`)"),
+    spawn_workers_with_slurm: bool = typer.Option(
+        False,
+        "--spawn-workers-with-slurm/--no-spawn-workers-with-slurm",
+        help="Let Slurm spawn one worker task per GPU (see `jz slurm batch --help`).",
+    ),
+    submit_job: bool = typer.Option(False, "--submit-job", help="Submit the job array to the cluster"),
+) -> None:
+    """Create (and submit) one SLURM job array running SCRIPT over a parameter grid."""
+    points = parse_grid(params, grid)
+    if not points or points == [{}]:
+        typer.echo("❌ Empty sweep: give at least one --param or a --grid file.")
+        raise typer.Exit(1)
+    remote_dir = get_rsync_base_dir(Path.cwd())
+    name = script_name("sweep")
+    args_path = remote_dir / f"{name}.args"
+    array = f"--array=0-{len(points) - 1}" + (f"%{max_concurrent}" if max_concurrent else "")
+    # Line N (from 1) of the arguments file holds the arguments of array task N - 1
+    preamble = f"""
+# Arguments of this array task
+eval "TASK_ARGS=($(sed -n "$((SLURM_ARRAY_TASK_ID + 1))p" {args_path}))"
 """
-    success = run(cmd_check_file, login_shell=True) == "success"
-    if not success:
-        typer.echo("❌ Failed to create file.")
+
+    def render(gpu_type: str) -> str:
+        return gpu_sbatch_script(
+            get_gpu_resource(gpu_type),
+            job_name,
+            time,
+            hint,
+            num_of_gpus,
+            module_load,
+            f'{script} "${{TASK_ARGS[@]}}"',
+            spawn_workers_with_slurm,
+            remote_dir,
+            preamble=preamble,
+            log_name="%x_%A_%a",
+            directives=f"#SBATCH {array}            # one array task per sweep point\n",
+        )
+
+    if gpu_type == "auto":
+        gpu_type = pick_gpu_type(render, num_of_gpus)
+    typer.echo(f"Sweep of {len(points)} task(s), submitted as one job array ({array}).")
+    upload_sbatch_script(
+        render(gpu_type), remote_dir, submit=submit_job, name=name, files={args_path: sweep_args(points)}
+    )
+
+
+_STAGE_DEFAULTS = {
+    "time": "02:00:00",
+    "hint": "nomultithread",
+    "num_of_gpus": 1,
+    "module_load": [],
+    "gpu_type": "v100-32g",
+    "spawn_workers_with_slurm": False,
+}
+
+
+@dataclass
+class PipelineStage:
+    """One stage of a pipeline spec: the options of `jz slurm batch` plus the stages it waits for."""
+
+    name: str
+    script: str
+    after: list[str]
+    options: dict[str, Any]
+    job_id: str = ""
+
+
+def parse_pipeline(spec: Any) -> list[PipelineStage]:
+    """Validate a pipeline spec (`{"stages": [...]}` or a plain list of stages) into ordered stages.
+
+    Each stage takes the `jz slurm batch` option names (`script`, `gpu_type`, `num_of_gpus`, `time`, ...). It runs
+    after the previous stage by default; `after` (a stage name or a list of them, `[]` for none) overrides that.
+    """
+    raw_stages = spec.get("stages", []) if isinstance(spec, dict) else spec
+    stages: list[PipelineStage] = []
+    for i, raw in enumerate(raw_stages):
+        raw = dict(raw)  # noqa: PLW2901
+        name = str(raw.pop("name", f"stage{i}"))
+        if "script" not in raw:
+            msg = f"Stage {name!r} has no script"
+            raise typer.BadParameter(msg)
+        after = raw.pop("after", [stages[-1].name] if stages else [])
+        after = [after] if isinstance(after, str) else list(after)
+        known = {stage.name for stage in stages}
+        if name in known or not set(after) <= known:
+            msg = f"Stage {name!r} is duplicated or depends on a stage not listed before it: {after}"
+            raise typer.BadParameter(msg)
+        options = {**_STAGE_DEFAULTS, "job_name": name, **raw}
+        unknown = set(options) - {*_STAGE_DEFAULTS, "job_name", "script"}
+        if unknown:
+            msg = f"Unknown option(s) in stage {name!r}: {', '.join(sorted(unknown))}"
+            raise typer.BadParameter(msg)
+        stages.append(PipelineStage(name, options.pop("script"), after, options))
+    return stages
+
+
+def _pipeline_submit_script(stages: list[PipelineStage], paths: list[Path], dependency: str) -> str:
+    """Remote script submitting every stage with its dependencies and printing `<index> <job id>` per stage.
+
+    If a submission fails, the stages already submitted are cancelled so that no half pipeline is left queued.
+    """
+    index = {stage.name: i for i, stage in enumerate(stages)}
+    lines = ["submitted="]
+    for i, (stage, path) in enumerate(zip(stages, paths)):
+        deps = ":".join(f"$jid_{index[name]}" for name in stage.after)
+        dep_arg = f"--dependency={dependency}:{deps} " if deps else ""
+        lines += [
+            f'jid_{i}=$(sbatch --parsable {dep_arg}{path}) || {{ [ -z "$submitted" ] || scancel $submitted; exit 1; }}',
+            f"jid_{i}=${{jid_{i}%%;*}}",
+            f'submitted="$submitted $jid_{i}"',
+            f"echo {i} $jid_{i}",
+        ]
+    return "\n".join(lines)
+
+
+@app.command()
+def pipeline(
+    spec_file: Path = typer.Argument(..., help="JSON or YAML pipeline spec listing the stages"),
+    dependency: str = typer.Option("afterok", "--dependency", help="SLURM dependency type between stages"),
+    submit_job: bool = typer.Option(False, "--submit-job", help="Submit the whole pipeline to the cluster"),
+    as_json: bool = typer.Option(False, "--json", help="Print the submitted job graph as JSON"),
+) -> None:
+    """Create (and submit) a chain of sbatch jobs, each stage starting after the ones it depends on."""
+    stages = parse_pipeline(load_spec_file(spec_file))
+    if not stages:
+        typer.echo("❌ The pipeline has no stages.")
         raise typer.Exit(1)
-    typer.echo(f"✅ File created at {filepath}")
+    remote_dir = get_rsync_base_dir(Path.cwd())
+    name = script_name("pipeline")
+    scripts = []
+    for stage in stages:
+        options = dict(stage.options)
+
+        def render(gpu_type: str, stage: PipelineStage = stage, options: dict = options) -> str:
+            return gpu_sbatch_script(
+                get_gpu_resource(gpu_type),
+                options["job_name"],
+                options["time"],
+                options["hint"],
+                options["num_of_gpus"],
+                list(options["module_load"]),
+                stage.script,
+                options["spawn_workers_with_slurm"],
+                remote_dir,
+            )
 
+        gpu_type = options["gpu_type"]
+        if gpu_type == "auto":
+            gpu_type = pick_gpu_type(render, options["num_of_gpus"])
+        scripts.append(render(gpu_type))
+
+    from rich.syntax import Syntax  # noqa: PLC0415
+
+    for stage, sbatch_script in zip(stages, scripts):
+        rprint(f"[bold]Stage {stage.name}[/bold] (after: {', '.join(stage.after) or '-'})")
+        rprint(Syntax(sbatch_script, "bash", line_numbers=True))
+    typer.confirm("Are the above SBATCH scripts correct?", abort=True)
+
+    # All scripts are written and (optionally) submitted with their dependencies in a single round trip
+    paths = [remote_dir / f"{name}_{i}_{stage.name}.slurm" for i, stage in enumerate(stages)]
+    upload_cmds, payload = _upload_commands(dict(zip(paths, scripts)))
+    cmds = [f"mkdir -p {remote_dir}", *upload_cmds]
     if submit_job:
-        cmd_submit = f"sbatch {filepath}"
-        typer.echo(f"Submitting job to cluster with command:\n{cmd_submit}")
-        run(cmd_submit, login_shell=True)
+        cmds.append(_pipeline_submit_script(stages, paths, dependency))
+    results = run_batch(cmds, login_shell=True, stop_on_failure=True, input=payload)
+    if not all(result.ok for result in results[: len(paths) + 1]):
+        typer.echo("❌ Failed to create the stage scripts.")
+        raise typer.Exit(1)
+    typer.echo(f"✅ {len(paths)} stage script(s) created in {remote_dir} ({name}_*.slurm)")
+    if not submit_job:
+        return
+
+    submission = results[-1]
+    for line in submission.stdout.splitlines():
+        i, _, job_id = line.partition(" ")
+        stages[int(i)].job_id = job_id
+    if not submission.ok:
+        typer.echo(f"❌ Submission failed, submitted stages were cancelled:\n{submission.stderr.strip()}")
+        raise typer.Exit(1)
+
+    job_ids = {stage.name: stage.job_id for stage in stages}
+    graph = [
+        {"stage": stage.name, "job_id": stage.job_id, "after": {name: job_ids[name] for name in stage.after}}
+        for stage in stages
+    ]
+    if as_json:
+        typer.echo(json.dumps(graph, indent=2))
+        return
+    table = Table("Stage", "Job ID", f"Starts after ({dependency})", box=box.MINIMAL)
+    for node in graph:
+        table.add_row(node["stage"], node["job_id"], ", ".join(f"{n} ({j})" for n, j in node["after"].items()) or "-")
+    Console().print(table)
+
+
+_LOG_PATHS_CACHE = "job-log-files"
+_LOG_OFFSETS_CACHE = "job-log-offsets"
+MAX_LOG_CHUNK = 4 * 1024 * 1024
+_LOG_STYLES = ("cyan", "magenta", "green", "yellow", "blue", "red")
+_SCONTROL_FIELD_RE = re.compile(r"(?:^|\s)(\w+)=(\S*)")
+_SACCT_LOG_FIELDS = "JobID,JobIDRaw,JobName,User,StdOut,StdErr"
+# `%%` is an escaped percent sign; node (`%N`) and step (`%s`, `%t`) patterns cannot be filled in and are kept
+_LOG_PATTERN_RE = re.compile(r"%(%|A|a|j|x|u)")
+
+
+def _log_cache_name(kind: str) -> str:
+    return f"{kind}-{get_remote_user()}"
+
+
+def _expand_log_pattern(path: str, values: dict[str, str]) -> str:
+    """Substitute the SLURM filename patterns (`%A`, `%a`, `%j`, `%x`, `%u`) that SLURM left in a log path."""
+    return _LOG_PATTERN_RE.sub(lambda m: values.get(m.group(1), m.group(0)), path)
+
+
+def _parse_log_files(output: str) -> tuple[dict[str, dict[str, str]], bool]:
+    """Parse `scontrol show job -o` (or `sacct -P -o JobID,JobIDRaw,JobName,User,StdOut,StdErr`) into log files.
+
+    Jobs are keyed by their ID, or `<array job>_<task>` for array tasks. Also returns whether every task has its files:
+    pending tasks of an array (`ArrayTaskId=5-10`, `123_[5-10]`) have none yet.
+    """
+    files: dict[str, dict[str, str]] = {}
+    complete = True
+    for line in output.splitlines():
+        if line.startswith("JobId="):
+            fields = dict(_SCONTROL_FIELD_RE.findall(line))
+            job, array_job, task = fields["JobId"], fields.get("ArrayJobId", ""), fields.get("ArrayTaskId", "")
+            name, user = fields.get("JobName", ""), fields.get("UserId", "").split("(")[0]
+            out, err = fields.get("StdOut", ""), fields.get("StdErr", "")
+        elif line.count("|") == 5:
+            job_id, job, name, user, out, err = line.split("|")
+            array_job, _, task = job_id.partition("_")
+        else:
+            continue
+        if task and not task.isdigit():
+            complete = False
+            continue
+        key = f"{array_job}_{task}" if task else job
+        values = {"%": "%", "A": array_job or job, "a": task, "j": job, "x": name, "u": user}
+        paths = {n: _expand_log_pattern(path, values) for n, path in (("out", out), ("err", err)) if path}
+        if paths:
+            files[key] = paths
+    return files, complete
+
+
+def resolve_log_paths(job_ids: list[str]) -> dict[str, dict[str, dict[str, str]]]:
+    """Return `{job_id: {job: {"out": path, "err": path}}}`, asking SLURM once per job.
+
+    A job array given by its ID maps to each of its tasks (`<array job>_<task>`). Finished jobs that `scontrol` no
+    longer knows are looked up with `sacct`.
+    """
+    known = cache.load(_log_cache_name(_LOG_PATHS_CACHE)) or {}
+    missing = [job_id for job_id in job_ids if job_id not in known]
+    if missing:
+        cmds = [
+            f"scontrol show job -o {shlex.quote(job_id)} 2>/dev/null | grep '^JobId='"
+            f" || sacct -n -P -X -j {shlex.quote(job_id)} -o {_SACCT_LOG_FIELDS} 2>/dev/null"
+            for job_id in missing
+        ]
+        resolved = {}
+        for job_id, result in zip(missing, run_batch(cmds, login_shell=True)):
+            files, complete = _parse_log_files(result.stdout)
+            resolved[job_id] = files
+            # Arrays with pending tasks are asked again next time, when more of their tasks may have started
+            if files and complete:
+                known[job_id] = files
+        cache.store(_log_cache_name(_LOG_PATHS_CACHE), known)
+        known = {**known, **resolved}
+    return {job_id: known[job_id] for job_id in job_ids if known.get(job_id)}
+
+
+def _job_active(job: str, squeue_output: str) -> bool:
+    """Whether `job` (a job ID or `<array job>_<task>`) is listed in `squeue -h -o "%A %F %K"` output."""
+    array_job, _, task = job.partition("_")
+    for line in squeue_output.splitlines():
+        fields = line.split()
+        if len(fields) != 3:
+            continue
+        job_id, base_id, index = fields
+        if not task and job in (job_id, base_id):
+            return True
+        if task and base_id == array_job and _index_matches(index, int(task)):
+            return True
+    return False
+
+
+def _index_matches(index: str, task: int) -> bool:
+    """Whether `task` is in a SLURM array index expression such as `4`, `[5-10%2]` or `1,3,7-9:2`."""
+    for part in index.strip("[]").split("%")[0].split(","):
+        bounds, _, step = part.partition(":")
+        first, _, last = bounds.partition("-")
+        if not first.isdigit() or not (last or first).isdigit():
+            continue
+        first, last = int(first), int(last or first)
+        if first <= task <= last and (task - first) % int(step or 1) == 0:
+            return True
+    return False
+
+
+def _check_choice(value: str, choices: tuple[str, ...]) -> str:
+    if value not in choices:
+        msg = f"{value!r} is not one of {', '.join(choices)}."
+        raise typer.BadParameter(msg)
+    return value
+
+
+def _fetch_command(path: str, offset: int | None, lines: int) -> str:
+    """Remote command printing the new offset and the size of `path`, then the bytes from `offset` to that offset.
+
+    At most `MAX_LOG_CHUNK` bytes are sent per call. Without an offset it starts `lines` lines before the end; `-1`
+    means the file does not exist yet.
+    """
+    quoted = shlex.quote(path)
+    start = str(offset) if offset is not None else f"$(( size - $(tail -n {lines} {quoted} | wc -c) ))"
+    return f"""if [ ! -f {quoted} ]; then echo -1; exit 0; fi
+size=$(stat -c %s {quoted}); off={start}
+[ "$size" -lt "$off" ] && off=0
+n=$(( size - off )); [ "$n" -gt {MAX_LOG_CHUNK} ] && n={MAX_LOG_CHUNK}
+echo $(( off + n )) "$size"
+tail -c +$(( off + 1 )) {quoted} | head -c "$n"
+"""
+
+
+def _log_targets(
+    job_ids: list[str], wanted: tuple[str, ...]
+) -> tuple[dict[str, dict[str, str]], list[tuple[str, str, str]]]:
+    """Resolve the log files of `job_ids`: `{job: {"out": path, "err": path}}` and the `(job, stream, path)` to read."""
+    resolved = resolve_log_paths(job_ids)
+    for job_id in (job_id for job_id in job_ids if job_id not in resolved):
+        typer.echo(f"⚠️  No log files found for job {job_id}.", err=True)
+    paths = {job: files for jobs in resolved.values() for job, files in jobs.items()}
+    targets = [(job, name, paths[job][name]) for job in paths for name in wanted if name in paths[job]]
+    return paths, targets
+
+
+def _print_log(console: Console, text: str, label: str = "") -> None:
+    """Print log lines, each prefixed with the `label` markup if given."""
+    # The label is rendered once and the lines written as is: going through rich line by line would take hours for
+    # a multi-GB log
+    prefix = ""
+    if label:
+        with console.capture() as capture:
+            console.print(label, end="")
+        prefix = capture.get()
+    console.file.write("".join(f"{prefix}{line}\n" for line in text.splitlines()))
+
+
+@app.command()
+def logs(
+    job_ids: list[str] = typer.Argument(..., help="Job ID(s) whose output to show"),
+    follow: bool = typer.Option(False, "--follow", "-f", help="Keep printing new output until the jobs end"),
+    streams: str = typer.Option(
+        "both",
+        "--stream",
+        callback=lambda value: _check_choice(value, ("out", "err", "both")),
+        help="Which log to show: out, err or both",
+    ),
+    lines: int = typer.Option(20, "--lines", "-n", help="Lines shown from a log that was never read before"),
+    from_start: bool = typer.Option(False, "--from-start", help="Read the logs from the beginning"),
+    interval: float = typer.Option(2.0, "--interval", min=0.5, help="Polling interval of --follow"),
+) -> None:
+    """Show the output of jobs, continuing from where the last `jz slurm logs` stopped."""
+    paths, targets = _log_targets(job_ids, ("out", "err") if streams == "both" else (streams,))
+    if not targets:
+        raise typer.Exit(1)
+    # Byte offsets are remembered per file, so a new invocation (or a reconnect) only fetches what was appended since
+    offsets: dict[str, int] = cache.load(_log_cache_name(_LOG_OFFSETS_CACHE)) or {}
+    if from_start:
+        offsets.update({path: 0 for _, _, path in targets})
+    labelled = len(targets) > 1
+    styles = {job_id: _LOG_STYLES[i % len(_LOG_STYLES)] for i, job_id in enumerate(paths)}
+    partial: dict[str, str] = {}
+    console = Console(highlight=False)
+
+    def emit(job_id: str, name: str, text: str) -> None:
+        label = f"[{styles[job_id]}]\\[{job_id}{':err' if name == 'err' else ''}][/] " if labelled else ""
+        _print_log(console, text, label)
+
+    def poll() -> set[str]:
+        # Logs that grew by more than `MAX_LOG_CHUNK` are read in several round trips, up to their current size
+        remaining = 1
+        while remaining:
+            cmds = [_fetch_command(path, offsets.get(path), lines) for _, _, path in targets]
+            cmds.append(f"squeue -h -o '%A %F %K' -j {','.join(shlex.quote(j) for j in paths)} 2>/dev/null")
+            results = run_batch(cmds, login_shell=True)
+            remaining = 0
+            for (job_id, name, path), result in zip(targets, results):
+                header, _, data = result.stdout.partition("\n")
+                if not result.ok or header.strip() in ("", "-1"):
+                    continue
+                offsets[path], size = (int(value) for value in header.split())
+                remaining += size - offsets[path]
+                # Only complete lines are printed; a trailing partial line waits for the rest of it
+                text = partial.pop(path, "") + data
+                complete, newline, rest = text.rpartition("\n")
+                if rest:
+                    partial[path] = rest
+                if newline:
+                    emit(job_id, name, complete)
+            cache.store(_log_cache_name(_LOG_OFFSETS_CACHE), offsets)
+        return {job for job in paths if _job_active(job, results[-1].stdout)}
+
+    try:
+        if not follow:
+            poll()
+            return
+        with session():
+            while True:
+                active = poll()
+                if not active:
+                    # The jobs ended: one last read picks up what they wrote before finishing
+                    poll()
+                    break
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for job_id, name, path in targets:
+            if path in partial:
+                emit(job_id, name, partial.pop(path))
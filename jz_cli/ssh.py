@@ -2,17 +2,45 @@
 
 from __future__ import annotations
 
+import atexit
+import base64
+import json
+import os
+import queue
 import shlex
+import socket
 import subprocess
+import sys
+import threading
 import time
-from pathlib import Path
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING
 
 import typer
+from rich.console import Console
 
-from .config import get_value
+from . import trace
+from .agent import RemoteAgent
+from .config import get_app_dir, get_profile, get_value
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
 
 app = typer.Typer(help="""SSH tool for persistent connection and remote command execution.""")
 
+_agent: RemoteAgent | None = None
+
+# Variables that describe the capturing shell or SSH session rather than the login environment.
+_SNAPSHOT_SKIP_VARS = {"_", "PWD", "OLDPWD", "SHLVL", "SSH_CLIENT", "SSH_CONNECTION", "SSH_TTY"}
+_REMOTE_SNAPSHOT_DIR = "$HOME/.cache/jz"
+
+DEFAULT_MASTER_START_TIMEOUT = 30.0
+_PROBE_TIMEOUT = 0.5
+DEFAULT_STREAM_BUFFER = 1000
+
 
 def get_remote_user() -> str:
     """Get the remote user from configuration."""
@@ -20,10 +48,15 @@ def get_remote_user() -> str:
 
 
 def _get_socket_path() -> Path:
-    # Using a more standard location for sockets, e.g. in the app's config dir
-    app_dir = Path(typer.get_app_dir("jz"))
-    app_dir.mkdir(parents=True, exist_ok=True)
-    return app_dir / f"ssh-{get_remote_user()}.sock"
+    # Using a more standard location for sockets, e.g. in the app's config dir. Each profile gets its own master
+    # connection, so that jz calls for different logins can run side by side.
+    profile = get_profile()
+    prefix = "ssh" if profile is None else f"ssh-{profile}"
+    return get_app_dir() / f"{prefix}-{get_remote_user()}.sock"
+
+
+def _get_env_snapshot_path() -> Path:
+    return _get_socket_path().with_suffix(".env.json")
 
 
 def get_ssh_opts() -> str:
@@ -32,16 +65,61 @@ def get_ssh_opts() -> str:
     return f"-S {socket_path}"
 
 
-def is_master_connection_active() -> bool:
-    """Check if the master SSH connection is active."""
+def _probe_socket(socket_path: Path) -> bool | None:
+    """Connect to the control socket directly instead of forking `ssh -O check`.
+
+    Returns True if a master accepts connections, False if the socket is stale, None if the probe is inconclusive.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(_PROBE_TIMEOUT)
+    try:
+        sock.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    except OSError:
+        return None
+    else:
+        return True
+    finally:
+        sock.close()
+
+
+def is_master_connection_active(thorough: bool = False) -> bool:
+    """Check if the master SSH connection is active.
+
+    By default a listening control socket is trusted without spawning `ssh -O check`; `thorough` always asks the
+    master. Sockets left behind by dead masters are removed.
+    """
     socket_path = _get_socket_path()
     if not socket_path.exists():
         return False
 
-    remote_user = get_remote_user()
-    cmd = ["ssh", "-S", socket_path, "-O", "check", remote_user]
-    result = subprocess.run(cmd, check=False, capture_output=True)  # noqa: S603
-    return result.returncode == 0
+    with trace.span("ssh.master_check") as attrs:
+        alive = None if thorough else _probe_socket(socket_path)
+        attrs["method"] = "socket"
+        if alive is None:
+            attrs["method"] = "ssh -O check"
+            remote_user = get_remote_user()
+            cmd = ["ssh", "-S", socket_path, "-O", "check", remote_user]
+            result = subprocess.run(cmd, check=False, capture_output=True)  # noqa: S603
+            alive = result.returncode == 0
+        if not alive and _probe_socket(socket_path) is False:
+            socket_path.unlink(missing_ok=True)
+    return alive
+
+
+def _wait_for_master(timeout: float) -> bool:
+    """Poll the control socket with exponential backoff until the master answers or `timeout` seconds pass."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        if is_master_connection_active():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 1.0)
 
 
 def start_master_connection(die_if_running: bool = False) -> None:
@@ -52,14 +130,16 @@ def start_master_connection(die_if_running: bool = False) -> None:
             raise typer.Exit(0)
         return
 
+    # A new master means a new login session: the cached login environment no longer applies.
+    invalidate_env_snapshot()
     remote_user = get_remote_user()
     typer.echo(f"Starting master connection for {remote_user}...")
     cmd = ["ssh", "-M", *get_ssh_opts().split(), "-fN", "-o", "ControlPersist=12h", remote_user]
-    subprocess.run(cmd, check=True)  # noqa: S603
-
-    # Wait a moment for the connection to be established
-    time.sleep(1)
-    if not is_master_connection_active():
+    timeout = float(get_value("master_start_timeout") or DEFAULT_MASTER_START_TIMEOUT)
+    with trace.span("ssh.master_start"):
+        subprocess.run(cmd, check=True)  # noqa: S603
+        started = _wait_for_master(timeout)
+    if not started:
         typer.echo("Failed to start master connection.", err=True)
         raise typer.Exit(1)
     typer.echo("Master connection started successfully.")
@@ -74,24 +154,301 @@ def stop_master_connection() -> None:
     typer.echo("Stopping master connection...")
     cmd = ["ssh", *get_ssh_opts().split(), "-O", "exit", get_remote_user()]
     subprocess.run(cmd, check=False)  # noqa: S603
+    invalidate_env_snapshot()
     typer.echo("Master connection stopped.")
 
 
-@app.command()
-def run(
-    cmd: str = typer.Argument(help="Command to run"),
-    login_shell: bool | None = typer.Option(False, help="Login to shell (e.g. to load environment variables)"),
-) -> str:
-    """Run a command to jz. If login_shell is True, the command will be run in a login shell (bash -l -c)."""
+def _socket_identity() -> list[int] | None:
+    try:
+        stat = _get_socket_path().stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_mtime_ns]
+
+
+def invalidate_env_snapshot() -> None:
+    """Drop the cached login-shell environment."""
+    _get_env_snapshot_path().unlink(missing_ok=True)
+
+
+def _capture_env_snapshot() -> dict | None:
+    """Run the login shell once and dump its exported variables and shell functions to a file on the remote host."""
+    identity = _socket_identity()
+    remote_path = f"{_REMOTE_SNAPSHOT_DIR}/env-{get_remote_user()}-{identity[0]}-{identity[1]}.sh" if identity else None
+    if remote_path is None:
+        return None
+    capture = f"""
+mkdir -p {_REMOTE_SNAPSHOT_DIR} && umask 077 || exit 1
+find {_REMOTE_SNAPSHOT_DIR} -name 'env-*.sh' -mtime +1 -delete 2>/dev/null
+unset {" ".join(sorted(_SNAPSHOT_SKIP_VARS))}
+{{ export -p | grep -v '^declare -[a-zA-Z]*r'; declare -f; declare -Fx; }} > {remote_path} && echo {remote_path}
+"""
+    with trace.span("ssh.env_capture"):
+        result = _exec(f"bash -l -c {shlex.quote(capture)}")
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines or not lines[-1].endswith(remote_path.rsplit("/", 1)[-1]):
+        return None
+    # Keep the path as expanded by the remote shell
+    snapshot = {"socket": identity, "remote_path": lines[-1]}
+    _get_env_snapshot_path().write_text(json.dumps(snapshot))
+    return snapshot
+
+
+def get_env_snapshot() -> dict | None:
+    """Return the login environment snapshot of the current master connection, capturing it if needed."""
+    path = _get_env_snapshot_path()
+    if path.exists():
+        snapshot = json.loads(path.read_text())
+        if snapshot.get("socket") == _socket_identity():
+            return snapshot
+    return _capture_env_snapshot()
+
+
+def _login_shell_command(cmd: str) -> str:
+    """Wrap `cmd` so it sees the login environment, replaying the snapshot instead of sourcing the profiles.
+
+    Falls back to a real login shell when no snapshot is available or the remote file has been removed.
+    """
+    snapshot = get_env_snapshot()
+    if snapshot is None:
+        return f"bash -l -c {shlex.quote(cmd)}"
+    remote_path = shlex.quote(snapshot["remote_path"])
+    # `cmd` is passed once, as `$1`, and only parsed after the snapshot is loaded
+    script = f'if [ -r {remote_path} ]; then . {remote_path}; eval "shift; $1"; else exec bash -l -c "$1" bash; fi'
+    return f"bash -c {shlex.quote(script)} bash {shlex.quote(cmd)}"
+
+
+def session_enabled() -> bool:
+    """Whether remote commands should go through the persistent session agent (`JZ_SESSION` or config `session`)."""
+    value = os.environ.get("JZ_SESSION") or get_value("session") or ""
+    return value.lower() in ("1", "on", "true", "yes")
+
+
+def open_session() -> RemoteAgent:
+    """Start the session agent (if not already running) so that `run()` sends commands through it."""
+    global _agent  # noqa: PLW0603
     start_master_connection()
-    remote_cmd = f"bash -l -c {shlex.quote(cmd)}" if login_shell else cmd
-    result = subprocess.run(  # noqa: S603
-        ["ssh", *get_ssh_opts().split(), get_remote_user(), remote_cmd], check=False, capture_output=True, text=True
-    )
+    if _agent is None or not _agent.alive:
+        _agent = RemoteAgent(["ssh", *get_ssh_opts().split(), get_remote_user()])
+        _agent.start()
+        atexit.register(close_session)
+    return _agent
+
+
+def close_session() -> None:
+    """Stop the session agent if it is running."""
+    global _agent  # noqa: PLW0603
+    if _agent is not None:
+        _agent.close()
+        _agent = None
+
+
+@contextmanager
+def session() -> Iterator[RemoteAgent]:
+    """Route every `run()` inside the block through a single persistent remote agent."""
+    agent = open_session()
+    try:
+        yield agent
+    finally:
+        close_session()
+
+
+def _exec(remote_cmd: str, input: str | None = None) -> subprocess.CompletedProcess:  # noqa: A002
+    """Execute an already-wrapped remote command through the session agent or a fresh `ssh` call.
+
+    `input` is sent to the command's stdin; the agent does not forward stdin, so such commands always use `ssh`.
+    """
+    with trace.span("ssh.exec") as attrs:
+        if input is None and (_agent is not None or session_enabled()):
+            attrs["via"] = "agent"
+            result = open_session().request(remote_cmd)
+        else:
+            attrs["via"] = "ssh"
+            result = subprocess.run(  # noqa: S603
+                ["ssh", *get_ssh_opts().split(), get_remote_user(), remote_cmd],
+                check=False,
+                capture_output=True,
+                text=True,
+                input=input,
+            )
+        attrs["bytes_out"] = len(remote_cmd.encode()) + len((input or "").encode())
+        attrs["bytes_in"] = len(result.stdout.encode()) + len(result.stderr.encode())
+    return result
+
+
+def run(cmd: str, login_shell: bool = False) -> str:
+    """Run a command to jz. If login_shell is True, the command will be run in a login shell (bash -l -c)."""
+    with trace.span("ssh.run", cmd=cmd[:200], login_shell=login_shell):
+        start_master_connection()
+        remote_cmd = _login_shell_command(cmd) if login_shell else cmd
+        result = _exec(remote_cmd)
     result.check_returncode()
     return result.stdout.strip()
 
 
+def _pump(pipe: IO[str], name: str, lines: queue.Queue) -> None:
+    for line in pipe:
+        lines.put((name, line.rstrip("\n")))
+    lines.put((name, None))
+
+
+def stream(
+    cmd: str, login_shell: bool = False, max_buffered_lines: int = DEFAULT_STREAM_BUFFER
+) -> Iterator[tuple[str, str]]:
+    """Run a command to jz, yielding `("stdout" | "stderr", line)` pairs as the remote command produces them.
+
+    At most `max_buffered_lines` lines are held locally; past that the remote side is slowed down instead of output
+    piling up in memory. Raises `subprocess.CalledProcessError` once the output is exhausted if the command failed.
+    """
+    with trace.span("ssh.stream", cmd=cmd[:200], login_shell=login_shell, bytes_in=0) as attrs:
+        for name, line in _stream(cmd, login_shell, max_buffered_lines):
+            attrs["bytes_in"] += len(line) + 1
+            yield name, line
+
+
+def _stream(cmd: str, login_shell: bool, max_buffered_lines: int) -> Iterator[tuple[str, str]]:
+    start_master_connection()
+    remote_cmd = _login_shell_command(cmd) if login_shell else cmd
+    if _agent is not None or session_enabled():
+        yield from open_session().stream(remote_cmd)
+        return
+
+    proc = subprocess.Popen(  # noqa: S603
+        ["ssh", *get_ssh_opts().split(), get_remote_user(), remote_cmd],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+    )
+    lines = queue.Queue(maxsize=max_buffered_lines)
+    for name, pipe in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+        threading.Thread(target=_pump, args=(pipe, name, lines), daemon=True).start()
+    open_pipes = 2
+    try:
+        while open_pipes:
+            name, line = lines.get()
+            if line is None:
+                open_pipes -= 1
+                continue
+            yield name, line
+    finally:
+        if open_pipes:
+            proc.kill()
+        proc.wait()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, remote_cmd)
+
+
+def run_live(cmd: str, login_shell: bool = False, status: str | None = None) -> None:
+    """Run a command to jz and print its output as it arrives, with an optional spinner; exit on failure."""
+    console = Console(highlight=False)
+    err_console = Console(stderr=True, highlight=False)
+    try:
+        with console.status(status) if status else nullcontext():
+            for name, line in stream(cmd, login_shell=login_shell):
+                (err_console if name == "stderr" else console).print(line, markup=False, soft_wrap=True)
+    except subprocess.CalledProcessError as e:
+        raise typer.Exit(e.returncode) from e
+
+
+@dataclass
+class CommandResult:
+    """Outcome of one command of a batch."""
+
+    cmd: str
+    stdout: str = ""
+    stderr: str = ""
+    returncode: int | None = None  # None when the command was skipped after an earlier failure
+
+    @property
+    def ok(self) -> bool:
+        """Whether the command ran and exited with status 0."""
+        return self.returncode == 0
+
+
+def _batch_script(cmds: list[str], token: str, stop_on_failure: bool) -> str:
+    """Build one remote script that runs `cmds` in order and prints a delimited, base64-encoded result for each."""
+    # The batch input stays readable on fd 3 while every command's stdin is /dev/null
+    lines = ["exec 3<&0", "__jz_tmp=$(mktemp -d) || exit 1", "trap 'rm -rf \"$__jz_tmp\"' EXIT"]
+    for i, cmd in enumerate(cmds):
+        lines += [
+            "(",
+            cmd,
+            ') >"$__jz_tmp/out" 2>"$__jz_tmp/err" </dev/null',
+            "__jz_rc=$?",
+            f"printf '%s %d %d\\n' {token} {i} $__jz_rc",
+            'base64 -w0 <"$__jz_tmp/out"; echo',
+            'base64 -w0 <"$__jz_tmp/err"; echo',
+        ]
+        if stop_on_failure:
+            lines.append('[ "$__jz_rc" -eq 0 ] || exit 0')
+    return "\n".join(lines)
+
+
+def _parse_batch_output(output: str, cmds: list[str], token: str) -> list[CommandResult]:
+    results = [CommandResult(cmd) for cmd in cmds]
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        parts = line.split()
+        if len(parts) != 3 or parts[0] != token or i + 2 >= len(lines):
+            continue
+        result = results[int(parts[1])]
+        result.returncode = int(parts[2])
+        result.stdout = base64.b64decode(lines[i + 1]).decode(errors="replace")
+        result.stderr = base64.b64decode(lines[i + 2]).decode(errors="replace")
+    return results
+
+
+def run_batch(
+    cmds: list[str],
+    login_shell: bool = False,
+    stop_on_failure: bool = False,
+    input: str | None = None,  # noqa: A002
+) -> list[CommandResult]:
+    """Run several commands in one remote invocation and return each command's output and exit code separately.
+
+    With `stop_on_failure`, commands after the first failing one are not run (their `returncode` stays None).
+    `input` is streamed to the remote side, where the commands can read it from file descriptor 3 (e.g. `head -c N
+    <&3`); large payloads go there rather than into the command line, whose arguments are limited to 128 KiB each.
+    """
+    with trace.span("ssh.run_batch", commands=len(cmds), login_shell=login_shell):
+        start_master_connection()
+        token = f"__JZ_{uuid.uuid4().hex}__"
+        script = _batch_script(cmds, token, stop_on_failure)
+        remote_cmd = _login_shell_command(script) if login_shell else f"bash -c {shlex.quote(script)}"
+        result = _exec(remote_cmd, input=input)
+    results = _parse_batch_output(result.stdout, cmds, token)
+    if result.returncode != 0 and all(r.returncode is None for r in results):
+        raise subprocess.CalledProcessError(result.returncode, remote_cmd, result.stdout, result.stderr)
+    return results
+
+
+@app.command("run")
+def run_command(
+    cmds: list[str] = typer.Argument(help="Command to run (with --batch, one command per argument; '-' reads stdin)"),
+    login_shell: bool = typer.Option(False, help="Login to shell (e.g. to load environment variables)"),
+    batch: bool = typer.Option(False, "--batch", help="Run every argument as a separate command in one round trip"),
+    stop_on_failure: bool = typer.Option(False, "--stop-on-failure", help="With --batch, stop at the first failure"),
+) -> None:
+    """Run a command to jz and print its output."""
+    if not batch:
+        run_live(" ".join(cmds), login_shell=login_shell)
+        return
+
+    if cmds == ["-"]:
+        cmds = [line for line in sys.stdin.read().splitlines() if line.strip()]
+    failed = False
+    for result in run_batch(cmds, login_shell=login_shell, stop_on_failure=stop_on_failure):
+        status = "skipped" if result.returncode is None else f"exit {result.returncode}"
+        typer.secho(f"$ {result.cmd}  [{status}]", bold=True)
+        typer.echo(result.stdout, nl=False)
+        typer.echo(result.stderr, nl=False, err=True)
+        failed = failed or not result.ok
+    if failed:
+        raise typer.Exit(1)
+
+
 @app.command()
 def start() -> None:
     """Start the persistent SSH connection."""
@@ -107,7 +464,7 @@ def stop() -> None:
 @app.command()
 def status() -> None:
     """Check the status of the persistent SSH connection."""
-    if is_master_connection_active():
+    if is_master_connection_active(thorough=True):
         typer.echo("SSH master connection is active.")
     else:
         typer.echo("SSH master connection is not active.")
@@ -2,22 +2,272 @@
 
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import heapq
+import os
+import re
+import shlex
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
 from pathlib import Path
+from stat import S_ISDIR
 
 import typer
+from rich import box
+from rich.console import Console
+from rich.table import Table
 
+from . import cache, trace
 from .config import get_value
-from .ssh import get_ssh_opts, run
+from .remote import get_rsync_base_dir
+from .ssh import get_ssh_opts, start_master_connection
+from .transfer import TransferProfile, candidate_profiles, get_profile, measure_profiles, pick_sample, save_profile
+from .watch import make_watcher
 
 app = typer.Typer(help="Sync local code to Jean Zay cluster.")
 
+DEFAULT_EXCLUDES = [".git", "__pycache__", ".ruff_cache", ".venv", "uv.lock"]
+
+_STATS_FIELDS = {
+    "Number of files": "files",
+    "Number of regular files transferred": "files_transferred",
+    "Total file size": "total_size",
+    "Total transferred file size": "transferred_size",
+    "Total bytes sent": "bytes_sent",
+    "Total bytes received": "bytes_received",
+}
+_STATS_RE = re.compile(r"^(" + "|".join(_STATS_FIELDS) + r"):\s*([\d,.]+)", re.MULTILINE)
+
 
 def get_remote_base_dir(local_dir: Path) -> Path:
-    """Get the remote base directory for syncing based on local directory name."""
-    scratch_dir = Path(run("echo \\$SCRATCH", login_shell=True).strip())
-    basename = Path(local_dir).resolve().name
-    return scratch_dir / "rsync" / basename
+    """Get the remote base directory for syncing based on local directory name (served from the remote facts cache)."""
+    return get_rsync_base_dir(local_dir)
+
+
+def is_excluded(rel_path: str, is_dir: bool, patterns: list[str]) -> bool:
+    """Approximate rsync's matching of `--exclude` patterns against a path relative to the transfer root."""
+    name = rel_path.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if pattern.endswith("/") and not is_dir:
+            continue
+        pattern = pattern.rstrip("/")  # noqa: PLW2901
+        if pattern.startswith("/"):
+            matched = fnmatch(rel_path, pattern[1:])
+        elif "/" in pattern:
+            matched = fnmatch(rel_path, pattern) or fnmatch(rel_path, f"*/{pattern}")
+        else:
+            matched = fnmatch(name, pattern)
+        if matched:
+            return True
+    return False
+
+
+def _tree_size(path: Path, rel_path: str, excludes: list[str]) -> int:
+    """Total size of the files under `path`, skipping excluded entries."""
+    if not path.is_dir() or path.is_symlink():
+        return path.lstat().st_size
+    total = 0
+    for root, dirs, files in os.walk(path):
+        rel_root = rel_path + root[len(str(path)) :]
+        dirs[:] = [d for d in dirs if not is_excluded(f"{rel_root}/{d}", True, excludes)]
+        for f in files:
+            if not is_excluded(f"{rel_root}/{f}", False, excludes):
+                try:
+                    total += Path(root, f).lstat().st_size
+                except FileNotFoundError:
+                    continue
+    return total
+
+
+def balance_shards(entries: list[tuple[str, int]], jobs: int) -> list[list[str]]:
+    """Split `(path, size)` entries into at most `jobs` shards of similar total size (largest first, greedy)."""
+    heap = [(0, i, []) for i in range(min(jobs, len(entries)))]
+    for path, size in sorted(entries, key=lambda e: e[1], reverse=True):
+        total, i, paths = heapq.heappop(heap)
+        paths.append(path)
+        heapq.heappush(heap, (total + size, i, paths))
+    return [paths for _, _, paths in sorted(heap, key=lambda s: s[1]) if paths]
+
+
+def parse_rsync_stats(output: str) -> dict[str, int]:
+    """Extract the `--stats` counters from rsync output."""
+    stats = {}
+    for label, value in _STATS_RE.findall(output):
+        stats[_STATS_FIELDS[label]] = int(float(value.replace(",", "")))
+    return stats
+
+
+@dataclass
+class ShardResult:
+    """Outcome of one rsync process of a sharded sync."""
+
+    paths: list[str]
+    returncode: int
+    elapsed: float
+    output: str = ""
+    stats: dict[str, int] = field(default_factory=dict)
+
+
+def rsync_command(excludes: list[str], delete: bool, verbose: bool, extra: list[str] | None = None) -> list[str]:
+    """Build the rsync argv shared by every sync mode (sources and destination are appended by the caller).
+
+    Compression is not included; pass a `TransferProfile`'s arguments through `extra`.
+    """
+    cmd = ["rsync", f"-a{'v' if verbose else ''}"]
+    if delete:
+        cmd.append("--delete")
+    cmd += ["-e", f"ssh {get_ssh_opts()}", *[f"--exclude={pattern}" for pattern in excludes], *(extra or [])]
+    return cmd
+
+
+def _run_shard(base_cmd: list[str], paths: list[str], src: str, dest: str, recursive: bool = True) -> ShardResult:
+    start = time.monotonic()
+    with trace.span("rsync.shard", entries=len(paths)) as attrs:
+        with tempfile.NamedTemporaryFile("w", prefix="jz-sync-", suffix=".list") as files_from:
+            files_from.write("\n".join(paths) + "\n")
+            files_from.flush()
+            cmd = [*base_cmd, *(["-r"] if recursive else []), "--stats", f"--files-from={files_from.name}", src, dest]
+            result = subprocess.run(cmd, check=False, capture_output=True, text=True)  # noqa: S603
+        stats = parse_rsync_stats(result.stdout)
+        attrs.update(bytes_out=stats.get("bytes_sent", 0), bytes_in=stats.get("bytes_received", 0))
+    output = result.stdout + result.stderr
+    return ShardResult(paths, result.returncode, time.monotonic() - start, output, stats)
+
+
+def run_sharded(
+    base_cmd: list[str], entries: list[tuple[str, int]], jobs: int, src: str, dest: str, recursive: bool = True
+) -> list[ShardResult]:
+    """Run one rsync per balanced shard of `entries`, `jobs` at a time, all over the shared master connection.
+
+    With `recursive=False` only the listed paths themselves are transferred (used for change lists).
+    """
+    shards = balance_shards(entries, jobs)
+    with ThreadPoolExecutor(max_workers=max(len(shards), 1)) as pool:
+        return list(pool.map(lambda paths: _run_shard(base_cmd, paths, src, dest, recursive), shards))
+
+
+def print_shard_summary(results: list[ShardResult]) -> None:
+    """Print per-shard and combined rsync statistics."""
+    table = Table("Shard", "Entries", "Files sent", "Data", "Bytes sent", "Time", "Exit", box=box.MINIMAL)
+    totals: dict[str, int] = {}
+    for i, result in enumerate(results):
+        for key, value in result.stats.items():
+            totals[key] = totals.get(key, 0) + value
+        table.add_row(
+            str(i),
+            str(len(result.paths)),
+            str(result.stats.get("files_transferred", "?")),
+            str(result.stats.get("transferred_size", "?")),
+            str(result.stats.get("bytes_sent", "?")),
+            f"{result.elapsed:.1f}s",
+            str(result.returncode),
+        )
+    table.add_section()
+    table.add_row(
+        "total",
+        str(sum(len(r.paths) for r in results)),
+        str(totals.get("files_transferred", 0)),
+        str(totals.get("transferred_size", 0)),
+        str(totals.get("bytes_sent", 0)),
+        f"{max((r.elapsed for r in results), default=0):.1f}s",
+        str(max((r.returncode for r in results), default=0)),
+    )
+    Console().print(table)
+
+
+def combine_stats(results: list[ShardResult]) -> dict[str, int]:
+    """Sum the rsync counters of several shards."""
+    totals: dict[str, int] = {}
+    for result in results:
+        for key, value in result.stats.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def print_transfer_report(stats: dict[str, int], profile: TransferProfile) -> None:
+    """Compare the logical bytes rsync had to send with the bytes that actually crossed the network."""
+    logical = stats.get("transferred_size", 0)
+    wire = stats.get("bytes_sent", 0) + stats.get("bytes_received", 0)
+    table = Table("Compression", "Files sent", "Logical bytes", "Bytes on the wire", "Ratio", box=box.MINIMAL)
+    ratio = f"{wire / logical:.2f}" if logical else "-"
+    table.add_row(str(profile), str(stats.get("files_transferred", 0)), f"{logical:,}", f"{wire:,}", ratio)
+    Console().print(table)
+
+
+def build_manifest(local_dir: Path, excludes: list[str], with_hash: bool = False, previous: dict | None = None) -> dict:
+    """Record `[size, mtime_ns, sha1]` for every file (and `[-1, 0, None]` for every directory) under `local_dir`.
+
+    Hashes are only computed with `with_hash`, and reused from `previous` when size and mtime are unchanged.
+    """
+    previous = previous or {}
+    manifest = {}
+    for root, dirs, files in os.walk(local_dir):
+        rel_root = os.path.relpath(root, local_dir)
+        prefix = "" if rel_root == "." else f"{rel_root}/"
+        dirs[:] = [d for d in dirs if not is_excluded(f"{prefix}{d}", True, excludes)]
+        for d in dirs:
+            manifest[f"{prefix}{d}"] = [-1, 0, None]
+        for f in files:
+            rel_path = f"{prefix}{f}"
+            if is_excluded(rel_path, False, excludes):
+                continue
+            try:
+                stat = Path(root, f).lstat()
+            except FileNotFoundError:
+                continue
+            digest = None
+            if with_hash:
+                old = previous.get(rel_path)
+                if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns and old[2]:
+                    digest = old[2]
+                else:
+                    digest = _file_hash(Path(root, f))
+            manifest[rel_path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return manifest
+
+
+def _file_hash(path: Path) -> str | None:
+    if path.is_symlink():
+        return os.readlink(path)
+    digest = hashlib.sha1()  # noqa: S324
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def diff_manifests(previous: dict, current: dict) -> tuple[list[str], list[str]]:
+    """Return the paths that are new or modified in `current`, and the paths that disappeared from `previous`."""
+    changed = []
+    for path, (size, mtime, digest) in current.items():
+        old = previous.get(path)
+        if old is None or old[0] != size:
+            changed.append(path)
+            continue
+        # Directories only matter when they appear; files compare by hash when both sides have one, else by mtime
+        content_changed = old[2] != digest if digest and old[2] else old[1] != mtime
+        if size >= 0 and content_changed:
+            changed.append(path)
+    deleted = [path for path in previous if path not in current]
+    return changed, deleted
+
+
+def _manifest_cache_name(local_dir: Path, remote_user: str, remote_base_dir: Path) -> str:
+    key = f"{Path(local_dir).resolve()}\0{remote_user}:{remote_base_dir}"
+    return f"sync-manifest-{hashlib.sha1(key.encode()).hexdigest()[:16]}"  # noqa: S324
+
+
+def _top_level_entries(local_dir: Path, excludes: list[str]) -> list[tuple[str, int]]:
+    return [
+        (entry.name, _tree_size(entry, entry.name, excludes))
+        for entry in sorted(local_dir.iterdir())
+        if not is_excluded(entry.name, entry.is_dir(), excludes)
+    ]
 
 
 @app.command()
@@ -26,6 +276,19 @@ def sync(
     remote_base_dir: str | None = typer.Option(None, help="Remote base directory"),
     exclude: list[str] = typer.Option(None, "--exclude", "-e", help="Additional rsync exclude patterns (can repeat)"),
     delete: bool = typer.Option(False, "--delete", help="Delete files that are not in the source directory"),
+    jobs: int = typer.Option(1, "--jobs", "-j", min=1, help="Number of parallel rsync streams (sharded by entry)"),
+    full: bool = typer.Option(False, "--full", help="Ignore the local manifest and let rsync compare the whole tree"),
+    checksum: bool = typer.Option(
+        False, "--checksum", help="Hash files so that touched-but-unchanged files are skipped"
+    ),
+    watch: bool = typer.Option(False, "--watch", "-w", help="Keep running and push changes as they happen"),
+    debounce: float = typer.Option(0.5, "--debounce", help="With --watch, seconds of quiet that close a batch"),
+    poll: bool = typer.Option(False, "--poll", help="With --watch, poll the tree instead of using inotify"),
+    compress: str = typer.Option(
+        "auto", "--compress", help="auto, none, zlib, zstd or lz4, optionally with a level (e.g. zstd:3)"
+    ),
+    tune: bool = typer.Option(False, "--tune", help="Measure compression settings on a sample and save the fastest"),
+    stats: bool = typer.Option(False, "--stats", help="Report bytes on the wire versus logical bytes"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Verbose output"),
 ) -> None:
     """Sync local directory to Jean Zay via rsync."""
@@ -36,17 +299,195 @@ def sync(
         remote_base_dir = get_remote_base_dir(local_dir)
     remote_base_dir = Path(remote_base_dir)
 
-    default_excludes = [".git", "__pycache__", ".ruff_cache", ".venv", "uv.lock"]
-    all_excludes = default_excludes + (exclude or [])
-    exclude_opts = " ".join([f"--exclude='{pattern}'" for pattern in all_excludes])
-    ssh_opts = get_ssh_opts()
-    rsh_opt = f"-e 'ssh {ssh_opts}'"
+    all_excludes = DEFAULT_EXCLUDES + (exclude or [])
+    src, dest = f"{local_dir}/", f"{remote_user}:{remote_base_dir}/"
 
-    cmd = (
-        f"rsync -a{'v' if verbose else ''}z {'--delete' if delete else ''} {rsh_opt} {exclude_opts} {local_dir}/ "
-        f"{remote_user}:{remote_base_dir}/"
-    )
-    typer.echo(f"Syncing {local_dir} to {remote_user}:{remote_base_dir} ...")
+    manifest_name = _manifest_cache_name(local_dir, remote_user, remote_base_dir)
+    previous = None if full else cache.load(manifest_name)
+    with trace.span("sync.manifest"):
+        current = build_manifest(
+            local_dir, all_excludes, with_hash=checksum, previous=(previous or {}).get("files") if previous else None
+        )
+    # An earlier sync without --delete may have left remote files that the manifest no longer knows about
+    if previous and (previous["excludes"] != all_excludes or (delete and not previous["delete"])):
+        previous = None
+
+    paths = None
+    if previous is not None:
+        changed, deleted = diff_manifests(previous["files"], current)
+        paths = changed + (deleted if delete else [])
+
+    # Resolved only once something has to move, so a no-op sync stays free of remote calls
+    profile, compress_args = None, []
+    if paths != [] or watch or tune:
+        profile, compress_choice = _resolve_profile(
+            remote_user, compress, tune, current, all_excludes, src, remote_base_dir
+        )
+        compress_args = profile.rsync_args(compress_choice)
+    base_cmd = rsync_command(all_excludes, delete, verbose, compress_args)
+
+    returncode, transfer_stats = 0, {}
+    if paths is None:
+        typer.echo(f"Syncing {local_dir} to {remote_user}:{remote_base_dir} ...")
+        returncode, transfer_stats = _full_sync(
+            base_cmd, local_dir, all_excludes, jobs, delete, verbose, src, dest, stats
+        )
+    elif not paths:
+        typer.echo(f"✅ {local_dir} unchanged since the last sync to {remote_user}:{remote_base_dir}.")
+    else:
+        typer.echo(f"Syncing {len(paths)} changed path(s) of {local_dir} to {remote_user}:{remote_base_dir} ...")
+        returncode, transfer_stats = push_paths(base_cmd, paths, current, jobs, delete, verbose, src, dest)
+    if stats and profile is not None:
+        print_transfer_report(transfer_stats, profile)
+
+    if returncode != 0:
+        raise typer.Exit(returncode)
+    manifest = {"excludes": all_excludes, "delete": delete, "files": current}
+    cache.store(manifest_name, manifest)
+
+    if watch:
+        typer.echo(f"👀 Watching {local_dir} for changes (Ctrl+C to stop)...")
+        with contextlib.suppress(KeyboardInterrupt):
+            _watch_loop(local_dir, manifest, manifest_name, base_cmd, jobs, delete, verbose, src, dest, debounce, poll)
+
+
+def _update_manifest(local_dir: Path, files: dict, paths: list[str]) -> None:
+    for path in paths:
+        try:
+            stat = (local_dir / path).lstat()
+        except FileNotFoundError:
+            files.pop(path, None)
+            continue
+        files[path] = [-1, 0, None] if S_ISDIR(stat.st_mode) else [stat.st_size, stat.st_mtime_ns, None]
+
+
+def _watch_loop(
+    local_dir: Path,
+    manifest: dict,
+    manifest_name: str,
+    base_cmd: list[str],
+    jobs: int,
+    delete: bool,
+    verbose: bool,
+    src: str,
+    dest: str,
+    debounce: float,
+    poll: bool,
+) -> None:
+    """Push debounced batches of local changes until interrupted."""
+    excludes = manifest["excludes"]
+    watcher = make_watcher(local_dir, lambda path, is_dir: is_excluded(path, is_dir, excludes), polling=poll)
+    # Keep the master up so every batch skips connection setup
+    start_master_connection()
+    batch = 0
+    try:
+        while True:
+            pending = watcher.poll(None)
+            first_event = time.monotonic()
+            # Extend the batch until the tree has been quiet for `debounce` seconds
+            while more := watcher.poll(debounce):
+                pending |= more
+            if watcher.overflowed:
+                watcher.overflowed = False
+                current = build_manifest(local_dir, excludes)
+                changed, deleted = diff_manifests(manifest["files"], current)
+                pending = set(changed + deleted)
+            paths = sorted(p for p in pending if delete or (local_dir / p).exists() or (local_dir / p).is_symlink())
+            if not paths:
+                continue
+            _update_manifest(local_dir, manifest["files"], paths)
+            returncode, _ = push_paths(base_cmd, paths, manifest["files"], jobs, delete, verbose, src, dest)
+            batch += 1
+            latency = time.monotonic() - first_event
+            status = "✅" if returncode == 0 else f"❌ (exit {returncode})"
+            typer.echo(f"{status} batch {batch}: {len(paths)} path(s) pushed, {latency:.2f}s after the first change")
+            if returncode == 0:
+                cache.store(manifest_name, manifest)
+    finally:
+        watcher.close()
+
+
+def _resolve_profile(
+    host: str, compress: str, run_tune: bool, manifest: dict, excludes: list[str], src: str, remote_base_dir: Path
+) -> tuple[TransferProfile, bool]:
+    profile, compress_choice = get_profile(host, compress)
+    if not run_tune:
+        return profile, compress_choice
+    sample = pick_sample(manifest)
+    typer.echo(f"⏱  Measuring {len(candidate_profiles())} compression settings on {len(sample)} sample file(s)...")
+    start_master_connection()
+    timings = measure_profiles(rsync_command(excludes, delete=False, verbose=False), sample, src, host, remote_base_dir)
+    table = Table("Compression", "Time", "Exit", box=box.MINIMAL)
+    for candidate, elapsed, returncode in timings:
+        table.add_row(str(candidate), f"{elapsed:.2f}s", str(returncode))
+    Console().print(table)
+    best, _, returncode = timings[0]
+    if returncode != 0:
+        typer.echo("⚠️  Every measurement failed; keeping the current settings.")
+        return profile, compress_choice
+    save_profile(host, best)
+    typer.echo(f"✅ Saved '{best}' as the transfer profile for {host}.")
+    return best, compress_choice
+
+
+def push_paths(
+    base_cmd: list[str], paths: list[str], manifest: dict, jobs: int, delete: bool, verbose: bool, src: str, dest: str
+) -> tuple[int, dict[str, int]]:
+    """Transfer only `paths` (relative to `src`) via `--files-from`; with `delete`, missing ones are removed too."""
+    extra = ["--delete-missing-args"] if delete else []
+    if jobs > 1:
+        start_master_connection()
+    entries = [(path, max(manifest.get(path, [0])[0], 0)) for path in paths]
+    results = run_sharded([*base_cmd, *extra], entries, jobs, src, dest, recursive=False)
+    for result in results:
+        if verbose or result.returncode != 0:
+            typer.echo(result.output, nl=False)
+    if jobs > 1:
+        print_shard_summary(results)
+    return max((r.returncode for r in results), default=0), combine_stats(results)
+
+
+def _full_sync(
+    base_cmd: list[str],
+    local_dir: Path,
+    excludes: list[str],
+    jobs: int,
+    delete: bool,
+    verbose: bool,
+    src: str,
+    dest: str,
+    stats: bool = False,
+) -> tuple[int, dict[str, int]]:
+    if jobs == 1:
+        cmd = [*base_cmd, *(["--stats"] if stats else []), src, dest]
+        if verbose:
+            typer.echo(f"Running command:\n{shlex.join(cmd)}\n")
+        if not stats:
+            with trace.span("rsync"):
+                return subprocess.run(cmd, check=False).returncode, {}  # noqa: S603
+        with trace.span("rsync") as attrs:
+            result = subprocess.run(cmd, check=False, capture_output=True, text=True)  # noqa: S603
+            transfer_stats = parse_rsync_stats(result.stdout)
+            attrs.update(
+                bytes_out=transfer_stats.get("bytes_sent", 0), bytes_in=transfer_stats.get("bytes_received", 0)
+            )
+        typer.echo(result.stdout, nl=False)
+        typer.echo(result.stderr, nl=False, err=True)
+        return result.returncode, transfer_stats
+
+    # All streams multiplex over one master connection instead of authenticating separately
+    start_master_connection()
+    entries = _top_level_entries(local_dir, excludes)
     if verbose:
-        typer.echo(f"Running command:\n{cmd}\n")
-    subprocess.run(cmd, check=False, shell=True)  # noqa: S602
+        typer.echo(f"Running {jobs} streams of:\n{shlex.join([*base_cmd, '-r', '--stats', src, dest])}\n")
+    results = run_sharded(base_cmd, entries, jobs, src, dest)
+    returncode = max((r.returncode for r in results), default=0)
+    if delete and returncode == 0:
+        # Shards only delete inside the entries they list; remove top-level entries that no longer exist locally
+        cleanup = [*base_cmd, "--no-recursive", "--dirs", src, dest]
+        returncode = subprocess.run(cleanup, check=False).returncode  # noqa: S603
+    for result in results:
+        if verbose or result.returncode != 0:
+            typer.echo(result.output, nl=False)
+    print_shard_summary(results)
+    return returncode, combine_stats(results)
@@ -0,0 +1,123 @@
+"""Timing spans for the remote operations of a jz command (`jz --profile`)."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+PROFILE_ENV = "JZ_PROFILE"
+
+
+@dataclass
+class Span:
+    """One timed operation; `start` is relative to the moment profiling was enabled."""
+
+    name: str
+    start: float
+    duration: float
+    thread: int
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+_enabled = os.environ.get(PROFILE_ENV, "").lower() in ("1", "on", "true", "yes")
+_origin = time.perf_counter()
+_spans: list[Span] = []
+_lock = threading.Lock()
+
+
+def enable() -> None:
+    """Start recording spans (idempotent)."""
+    global _enabled  # noqa: PLW0603
+    _enabled = True
+
+
+def enabled() -> bool:
+    """Whether spans are being recorded."""
+    return _enabled
+
+
+def spans() -> list[Span]:
+    """Return the spans recorded so far, in the order they finished."""
+    with _lock:
+        return list(_spans)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """Time the block as `name`; the yielded dict collects attributes such as `bytes_in` and `bytes_out`.
+
+    Nothing is recorded (and almost nothing done) unless profiling is enabled.
+    """
+    if not _enabled:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        end = time.perf_counter()
+        with _lock:
+            _spans.append(Span(name, start - _origin, end - start, threading.get_ident(), attrs))
+
+
+def summary() -> list[dict[str, Any]]:
+    """Aggregate the spans by name: count, total/max milliseconds and bytes in/out."""
+    rows: dict[str, dict[str, Any]] = {}
+    for s in spans():
+        row = rows.setdefault(s.name, {"name": s.name, "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        row["count"] += 1
+        row["total_ms"] += s.duration * 1000
+        row["max_ms"] = max(row["max_ms"], s.duration * 1000)
+        for key in ("bytes_in", "bytes_out"):
+            if key in s.attrs:
+                row[key] = row.get(key, 0) + s.attrs[key]
+    return sorted(rows.values(), key=lambda row: row["total_ms"], reverse=True)
+
+
+def print_summary() -> None:
+    """Print the per-operation breakdown to stderr."""
+    from rich import box  # noqa: PLC0415
+    from rich.console import Console  # noqa: PLC0415
+    from rich.table import Table  # noqa: PLC0415
+
+    table = Table("Operation", "Calls", "Total (ms)", "Max (ms)", "Bytes in", "Bytes out", box=box.MINIMAL)
+    for row in summary():
+        table.add_row(
+            row["name"],
+            str(row["count"]),
+            f"{row['total_ms']:.1f}",
+            f"{row['max_ms']:.1f}",
+            f"{row['bytes_in']:,}" if "bytes_in" in row else "-",
+            f"{row['bytes_out']:,}" if "bytes_out" in row else "-",
+        )
+    console = Console(stderr=True)
+    console.print(table)
+    console.print(f"Wall time: {(time.perf_counter() - _origin) * 1000:.1f} ms")
+
+
+def write_chrome_trace(path: Path) -> None:
+    """Write the spans as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev)."""
+    pid = os.getpid()
+    events = [
+        {
+            "name": s.name,
+            "cat": s.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": s.start * 1e6,
+            "dur": s.duration * 1e6,
+            "pid": pid,
+            "tid": s.thread,
+            "args": s.attrs,
+        }
+        for s in spans()
+    ]
+    path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str))
@@ -0,0 +1,191 @@
+"""Transfer tuning for rsync: compressor choice, skip-compress list and per-host profiles."""
+
+from __future__ import annotations
+
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING
+
+import typer
+
+from . import cache
+from .config import get_value, set_value
+from .remote import get_remote_facts
+from .ssh import run
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Suffixes rsync should not try to compress (already compressed or high-entropy formats)
+SKIP_COMPRESS = [
+    "7z", "avi", "bz2", "ckpt", "deb", "flac", "gif", "gz", "jpeg", "jpg", "lz4", "lzma", "mkv", "mov", "mp3", "mp4",
+    "npz", "ogg", "parquet", "png", "pt", "pth", "rar", "rpm", "safetensors", "tgz", "txz", "webm", "webp", "xz",
+    "zip", "zst",
+]  # fmt: skip
+PREFERRED_COMPRESSORS = ("zstd", "lz4")
+COMPRESSORS = ("auto", "none", "zlib", "zstd", "lz4")
+# Levels accepted by rsync for each compressor; the others take none
+COMPRESS_LEVELS = {"zlib": (0, 9), "zstd": (-131072, 22)}
+TUNE_SAMPLE_BYTES = 64 * 1024 * 1024
+_LOCAL_RSYNC_TTL = 24 * 3600
+_TUNE_DIR_RE = re.compile(r"/\.jz-tune-[0-9a-f]{8}$")
+
+
+@dataclass
+class TransferProfile:
+    """Compression settings passed to rsync."""
+
+    compress: str = "zlib"  # none, zlib, zstd or lz4
+    level: int | None = None
+
+    def rsync_args(self, compress_choice: bool = True) -> list[str]:
+        """Return the rsync arguments for this profile (`compress_choice` when both ends support rsync >= 3.2)."""
+        if self.compress == "none":
+            return []
+        args = ["-z", f"--skip-compress={'/'.join(SKIP_COMPRESS)}"]
+        if compress_choice:
+            args.append(f"--compress-choice={self.compress}")
+        if self.level is not None:
+            args.append(f"--compress-level={self.level}")
+        return args
+
+    def __str__(self) -> str:  # noqa: D105
+        return self.compress if self.level is None else f"{self.compress}:{self.level}"
+
+
+def parse_compress_list(version_output: str) -> list[str]:
+    """Return the compressors listed by `rsync --version` (rsync < 3.2 has no list and only supports zlib)."""
+    lines = version_output.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip().lower().startswith("compress list"):
+            return lines[i + 1].split() if i + 1 < len(lines) else []
+    return []
+
+
+def _local_rsync_version() -> str:
+    version = cache.load("local-rsync-version", ttl=_LOCAL_RSYNC_TTL)
+    if version is None:
+        if shutil.which("rsync") is None:
+            return ""
+        version = subprocess.run(["rsync", "--version"], check=False, capture_output=True, text=True).stdout
+        cache.store("local-rsync-version", version)
+    return version
+
+
+def common_compressors() -> list[str]:
+    """Compressors supported by both the local and the remote rsync (empty if either predates rsync 3.2)."""
+    local = parse_compress_list(_local_rsync_version())
+    if not local:
+        return []
+    remote = parse_compress_list(get_remote_facts().get("rsync_version", ""))
+    return [c for c in local if c in remote]
+
+
+def _saved_profiles() -> dict:
+    return get_value("transfer_profiles") or {}
+
+
+def get_profile(host: str, compress: str = "auto") -> tuple[TransferProfile, bool]:
+    """Resolve `compress` (auto, none, zlib, zstd, lz4 or `name:level`) for `host`.
+
+    Returns the profile and whether `--compress-choice` can be used. `auto` prefers a profile saved by `--tune`,
+    then zstd/lz4 when both rsyncs support them, then plain zlib.
+    """
+    common = common_compressors()
+    if compress == "auto":
+        saved = _saved_profiles().get(host)
+        if saved and (saved["compress"] in ("none", "zlib") or saved["compress"] in common):
+            profile = TransferProfile(**saved)
+        else:
+            best = next((c for c in PREFERRED_COMPRESSORS if c in common), "zlib")
+            profile = TransferProfile(best)
+    else:
+        profile = parse_compress(compress)
+        # rsync < 3.2 on either end only speaks zlib
+        if profile.compress not in ("none", "zlib") and profile.compress not in common:
+            supported = ", ".join(["none", "zlib", *(c for c in common if c != "zlib")])
+            msg = f"{profile.compress} is not supported by both the local and the remote rsync (use {supported})."
+            raise typer.BadParameter(msg, param_hint="'--compress'")
+    return profile, bool(common)
+
+
+def parse_compress(compress: str) -> TransferProfile:
+    """Parse an explicit `--compress` value (`none`, `zlib`, `zstd` or `lz4`, optionally with `:level`)."""
+    name, sep, level = compress.partition(":")
+    if name not in COMPRESSORS:
+        msg = f"{compress!r} is not one of {', '.join(COMPRESSORS)} (optionally with a level, e.g. zstd:3)."
+        raise typer.BadParameter(msg, param_hint="'--compress'")
+    if not sep:
+        return TransferProfile(name)
+    if name not in COMPRESS_LEVELS:
+        msg = f"{name} does not take a level."
+        raise typer.BadParameter(msg, param_hint="'--compress'")
+    low, high = COMPRESS_LEVELS[name]
+    try:
+        value = int(level)
+    except ValueError:
+        value = None
+    if value is None or not low <= value <= high:
+        msg = f"the {name} level must be an integer from {low} to {high}, not {level!r}."
+        raise typer.BadParameter(msg, param_hint="'--compress'")
+    return TransferProfile(name, value)
+
+
+def save_profile(host: str, profile: TransferProfile) -> None:
+    """Remember `profile` as the `auto` choice for `host`."""
+    profiles = _saved_profiles()
+    profiles[host] = asdict(profile)
+    set_value("transfer_profiles", profiles)
+
+
+def candidate_profiles() -> list[TransferProfile]:
+    """Profiles worth measuring with the rsync versions on both ends."""
+    common = common_compressors()
+    candidates = [TransferProfile("none"), TransferProfile("zlib", 6)]
+    if "lz4" in common:
+        candidates.append(TransferProfile("lz4"))
+    if "zstd" in common:
+        candidates += [TransferProfile("zstd", 1), TransferProfile("zstd", 3)]
+    return candidates
+
+
+def pick_sample(manifest: dict, budget: int = TUNE_SAMPLE_BYTES) -> list[str]:
+    """Choose up to `budget` bytes of files from a sync manifest, largest first, for throughput measurements."""
+    sample, total = [], 0
+    for path, (size, _, _) in sorted(manifest.items(), key=lambda item: item[1][0], reverse=True):
+        if size <= 0 or total + size > budget:
+            continue
+        sample.append(path)
+        total += size
+    return sample
+
+
+def measure_profiles(
+    base_cmd: list[str], sample: list[str], src: str, host: str, remote_base_dir: Path
+) -> list[tuple[TransferProfile, float, int]]:
+    """Send `sample` once per candidate profile into a scratch directory and time each run.
+
+    Returns `(profile, seconds, returncode)` tuples, fastest first. `base_cmd` must not carry compression flags.
+    """
+    remote_tmp = f"{remote_base_dir}/.jz-tune-{uuid.uuid4().hex[:8]}"
+    compress_choice = bool(common_compressors())
+    timings = []
+    with tempfile.NamedTemporaryFile("w", prefix="jz-tune-", suffix=".list") as files_from:
+        files_from.write("\n".join(sample) + "\n")
+        files_from.flush()
+        for profile in candidate_profiles():
+            # --ignore-times + --whole-file resend everything so each run moves the same bytes
+            cmd = [*base_cmd, *profile.rsync_args(compress_choice), "-I", "-W", f"--files-from={files_from.name}"]
+            start = time.monotonic()
+            result = subprocess.run([*cmd, src, f"{host}:{remote_tmp}/"], check=False, capture_output=True)  # noqa: S603
+            timings.append((profile, time.monotonic() - start, result.returncode))
+    # Only ever delete the scratch directory created above
+    if _TUNE_DIR_RE.search(remote_tmp):
+        run(f"rm -rf {shlex.quote(remote_tmp)}")
+    return sorted(timings, key=lambda t: (t[2] != 0, t[1]))
@@ -0,0 +1,157 @@
+"""Filesystem change watchers used by `jz sync --watch` (inotify on Linux, polling elsewhere)."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Decides whether a path (relative to the watched root) is ignored: (rel_path, is_dir) -> bool
+ExcludeFn = Callable[[str, bool], bool]
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher reporting changed paths relative to `root`."""
+
+    def __init__(self, root: Path, excluded: ExcludeFn) -> None:
+        self.root = Path(root)
+        self.excluded = excluded
+        self.overflowed = False
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+        self._add_tree("")
+
+    def _add_tree(self, rel_dir: str) -> list[str]:
+        """Watch `rel_dir` and every non-excluded directory below it; return the paths found inside."""
+        found = []
+        for root, dirs, files in os.walk(self.root / rel_dir):
+            rel_root = os.path.relpath(root, self.root)
+            rel_root = "" if rel_root == "." else rel_root
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), _WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = rel_root
+            prefix = f"{rel_root}/" if rel_root else ""
+            dirs[:] = [d for d in dirs if not self.excluded(f"{prefix}{d}", True)]
+            found += [f"{prefix}{d}" for d in dirs]
+            found += [f"{prefix}{f}" for f in files if not self.excluded(f"{prefix}{f}", False)]
+        return found
+
+    def poll(self, timeout: float | None) -> set[str]:
+        """Wait up to `timeout` seconds (forever if None) and return the paths changed meanwhile."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return set()
+            # Events on excluded paths are dropped; keep waiting rather than end the wait early
+            changed = self._read_events()
+            if changed or self.overflowed:
+                return changed
+
+    def _read_events(self) -> set[str]:
+        data = os.read(self._fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size : offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if wd not in self._dirs or not name:
+                continue
+            parent = self._dirs[wd]
+            rel_path = f"{parent}/{os.fsdecode(name)}" if parent else os.fsdecode(name)
+            is_dir = bool(mask & IN_ISDIR)
+            if self.excluded(rel_path, is_dir):
+                continue
+            changed.add(rel_path)
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may land in a new directory before its watch exists; report them from a scan
+                changed.update(self._add_tree(rel_path))
+        return changed
+
+    def close(self) -> None:
+        """Release the inotify descriptor."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that rescans the tree every `interval` seconds and diffs (size, mtime) snapshots."""
+
+    def __init__(self, root: Path, excluded: ExcludeFn, interval: float = 1.0) -> None:
+        self.root = Path(root)
+        self.excluded = excluded
+        self.interval = interval
+        self.overflowed = False
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for root, dirs, files in os.walk(self.root):
+            rel_root = os.path.relpath(root, self.root)
+            prefix = "" if rel_root == "." else f"{rel_root}/"
+            dirs[:] = [d for d in dirs if not self.excluded(f"{prefix}{d}", True)]
+            for d in dirs:
+                snapshot[f"{prefix}{d}"] = (-1, 0)
+            for f in files:
+                if self.excluded(f"{prefix}{f}", False):
+                    continue
+                try:
+                    stat = Path(root, f).lstat()
+                except FileNotFoundError:
+                    continue
+                snapshot[f"{prefix}{f}"] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout: float | None) -> set[str]:
+        """Wait up to `timeout` seconds (forever if None) and return the paths changed meanwhile."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval if deadline is None else min(self.interval, max(deadline - time.monotonic(), 0))
+            time.sleep(wait)
+            snapshot = self._scan()
+            changed = {p for p in snapshot.keys() | self._snapshot.keys() if snapshot.get(p) != self._snapshot.get(p)}
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+def make_watcher(root: Path, excluded: ExcludeFn, polling: bool = False) -> InotifyWatcher | PollingWatcher:
+    """Return an inotify watcher on Linux, or a polling watcher if inotify is unavailable or `polling` is set."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, excluded)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, excluded)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING
+
+from jz_cli import aio
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def _peak(log: str) -> int:
+    events = sorted(
+        (int(stamp), 1 if kind == "start" else -1) for kind, stamp in (line.split() for line in log.split("\n") if line)
+    )
+    running = peak = 0
+    for _, delta in events:
+        running += delta
+        peak = max(peak, running)
+    return peak
+
+
+def test_run_many_respects_max_concurrency(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_ssh = tmp_path / "ssh"
+    fake_ssh.write_text('#!/bin/sh\nshift\nexec sh -c "$1"\n')
+    fake_ssh.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    # A slow connection set-up, so that every command is waiting on it before it completes
+    monkeypatch.setattr(aio, "start_master_connection", lambda: time.sleep(0.2))
+    monkeypatch.setattr(aio, "get_ssh_opts", lambda: "")
+    monkeypatch.setattr(aio, "get_remote_user", lambda: "user@host")
+
+    log = tmp_path / "log"
+    cmd = f"echo start $(date +%s%N) >> {log}; sleep 0.2; echo end $(date +%s%N) >> {log}"
+
+    async def main() -> list:
+        session = aio.RemoteSession(max_concurrency=2)
+        return await session.run_many([cmd] * 6)
+
+    results = asyncio.run(main())
+    assert all(r.ok for r in results)
+    assert _peak(log.read_text()) == 2
@@ -0,0 +1,90 @@
+import json
+
+from jz_cli.idris import AccountRecord, QuotaRecord, parse_accounting, parse_quota
+
+IDRACCT = """\
+Derniere mise a jour le 15-11-2023 08:00:04
+################################################################################
+PROJET abc SUR JEAN-ZAY
+################################################################################
+================================================================================
+CPU (du 01-11-2023 au 31-10-2024)                   Allocation : 100000 h.cpu
+ Consommation :     12345 h.cpu (12.35 %)
+--------------------------------------------------------------------------------
+Compte       Proprietaire                   Consommation   Nb travaux
+abc001       Dupont                             12345.00          42
+================================================================================
+GPU V100 (du 01-11-2023 au 31-10-2024)              Allocation : 5 000 h.gpu
+ Consommation :      1234.5 h.gpu (24.69 %)
+--------------------------------------------------------------------------------
+Compte       Proprietaire                   Consommation   Nb travaux
+abc001       Dupont                              1234.50           7
+"""
+
+
+def test_parse_accounting_headers():
+    assert parse_accounting(IDRACCT) == [
+        AccountRecord("abc", "CPU", 100000.0, 12345.0),
+        AccountRecord("abc", "GPU V100", 5000.0, 1234.5),
+    ]
+
+
+def test_parse_accounting_ignores_date_range():
+    output = "CPU (du 01-11-2023 au 31-10-2024)  Allocation : 100000 h.cpu\nConsommation : 12345 h.cpu\n"
+    assert parse_accounting(output) == [AccountRecord("", "CPU", 100000.0, 12345.0)]
+
+
+def test_parse_accounting_keyed_lines():
+    output = "Projet : xyz\nAllocation V100 : 100 h.gpu\nAllocation A100 : 50 h.gpu\nConsommation A100 : 10 h.gpu\n"
+    output += "Consommation V100 : 20 h.gpu\n"
+    assert parse_accounting(output) == [
+        AccountRecord("xyz", "V100", 100.0, 20.0),
+        AccountRecord("xyz", "A100", 50.0, 10.0),
+    ]
+
+
+def test_parse_accounting_several_projects():
+    output = IDRACCT + IDRACCT.replace("PROJET abc", "PROJET def")
+    assert [(r.project, r.partition) for r in parse_accounting(output)] == [
+        ("abc", "CPU"),
+        ("abc", "GPU V100"),
+        ("def", "CPU"),
+        ("def", "GPU V100"),
+    ]
+
+
+def test_parse_accounting_incomplete_or_ambiguous():
+    # Missing consumption, consumption before any header, repeated figure, unknown layout
+    assert parse_accounting("CPU (du 01-11-2023 au 31-10-2024)  Allocation : 100000 h.cpu\n") == []
+    assert parse_accounting("Consommation : 12345 h.cpu\n") == []
+    assert parse_accounting(IDRACCT + " Consommation :     1 h.gpu\n") == []
+    assert parse_accounting("CPU | 01-11-2023 | 31-10-2024\n") == []
+
+
+# `idr_quota_user -j`: one object per space, keyed by the space name
+IDR_QUOTA_USER = """{
+  "HOME": {"uid": 123456, "gid": 654321, "bytes_used": 2147483648, "bytes_quota": 3221225472,
+           "inodes_used": 12000, "inodes_quota": 150000, "grace": 0},
+  "WORK": {"uid": 123456, "gid": 654321, "bytes_used": "1.5T", "bytes_quota": "5T",
+           "inodes_used": 400000, "inodes_quota": 500000, "bytes_percent": 30}
+}"""
+
+# Spectrum Scale style records, as printed for projects (`idrquota`): figures in KiB and id columns
+IDRQUOTA = """[
+  {"filesystemName": "gpfsstore", "quotaType": "GRP", "id": 3001, "name": "abc",
+   "blockUsage": 1048576, "blockQuota": 52428800, "blockLimit": 62914560, "blockInDoubt": 0,
+   "filesUsage": 1000, "filesQuota": 100000, "filesLimit": 110000, "filesInDoubt": 0},
+  {"id": 3002, "uid": 10, "gid": 20, "blockGrace": 0}
+]"""
+
+
+def test_parse_quota_named_spaces():
+    assert parse_quota(json.loads(IDR_QUOTA_USER)) == [
+        QuotaRecord("HOME", 2147483648.0, 3221225472.0, 12000.0, 150000.0),
+        QuotaRecord("WORK", 1.5 * 1024**4, 5.0 * 1024**4, 400000.0, 500000.0),
+    ]
+
+
+def test_parse_quota_ignores_ids_and_unnamed_rows():
+    assert parse_quota(json.loads(IDRQUOTA)) == [QuotaRecord("gpfsstore", 1024**3, 50.0 * 1024**3, 1000.0, 100000.0)]
+    assert parse_quota([{"uid": 1, "gid": 2, "used": 3}]) == []
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import contextlib
+import subprocess
+from typing import TYPE_CHECKING
+
+import pytest
+from typer.testing import CliRunner
+
+from jz_cli import slurm
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+
+def _watch_delays(monkeypatch: pytest.MonkeyPatch, get_jobs: Callable[[list[str]], list], polls: int) -> list[float]:
+    delays = []
+
+    def sleep(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == polls:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(slurm, "get_jobs", get_jobs)
+    monkeypatch.setattr(slurm, "session", contextlib.nullcontext)
+    monkeypatch.setattr(slurm.time, "sleep", sleep)
+    with pytest.raises(KeyboardInterrupt):
+        slurm._watch_queue([], 5)
+    return delays
+
+
+def test_watch_queue_backs_off_while_empty(monkeypatch: pytest.MonkeyPatch) -> None:
+    delays = _watch_delays(monkeypatch, lambda _: [], 6)
+    assert delays == [5, 10, 20, 40, 60, 60]
+
+
+def test_watch_queue_resets_on_change(monkeypatch: pytest.MonkeyPatch) -> None:
+    job = slurm.JobRecord("1", "gpu_p13", "PENDING", "0:00", "1:00:00", 1, "gpu:1", "", "Priority", "train")
+    snapshots = iter([[], [], [job], [job]])
+    delays = _watch_delays(monkeypatch, lambda _: next(snapshots), 4)
+    assert delays == [5, 10, 5, 10]
+
+
+SCONTROL_ARRAY = (
+    "JobId=130 ArrayJobId=123 ArrayTaskId=4 JobName=sweep UserId=abc001(1234) JobState=RUNNING "
+    "StdErr=/work/job_logs/sweep_123_4.err StdIn=/dev/null StdOut=/work/job_logs/sweep_123_4.out Power=\n"
+    "JobId=123 ArrayJobId=123 ArrayTaskId=5-10%2 JobName=sweep UserId=abc001(1234) JobState=PENDING "
+    "StdErr=/work/job_logs/sweep_%A_%a.err StdIn=/dev/null StdOut=/work/job_logs/sweep_%A_%a.out Power=\n"
+)
+
+
+def test_parse_log_files_array_tasks():
+    files, complete = slurm._parse_log_files(SCONTROL_ARRAY)
+    assert files == {"123_4": {"out": "/work/job_logs/sweep_123_4.out", "err": "/work/job_logs/sweep_123_4.err"}}
+    assert not complete
+
+
+def test_parse_log_files_sacct_expands_patterns():
+    output = "123_4|130|sweep|abc001|/work/logs/%x_%A_%a.out|/work/logs/%x_%j.err\n77|77|train|abc001|/w/%u_%%.out|\n"
+    files, complete = slurm._parse_log_files(output)
+    assert files == {
+        "123_4": {"out": "/work/logs/sweep_123_4.out", "err": "/work/logs/sweep_130.err"},
+        "77": {"out": "/w/abc001_%.out"},
+    }
+    assert complete
+
+
+def test_job_active_array_ids():
+    squeue = "130 123 4\n123 123 [5-10%2]\n200 200 N/A\n"
+    assert slurm._job_active("123_4", squeue)
+    assert slurm._job_active("123_7", squeue)
+    assert not slurm._job_active("123_11", squeue)
+    assert slurm._job_active("123", squeue)
+    assert slurm._job_active("130", squeue)
+    assert slurm._job_active("200", squeue)
+    assert not slurm._job_active("201", squeue)
+    assert slurm._index_matches("1,3,7-11:2", 9)
+    assert not slurm._index_matches("1,3,7-11:2", 8)
+
+
+def test_fetch_command_reports_size_and_caps_chunks(tmp_path: Path) -> None:
+    log = tmp_path / "job.out"
+    log.write_bytes(b"x" * (slurm.MAX_LOG_CHUNK + 10))
+    output = subprocess.run(  # noqa: S603
+        ["bash", "-c", slurm._fetch_command(str(log), 0, 20)], check=True, capture_output=True
+    ).stdout
+    header, _, data = output.partition(b"\n")
+    assert header.split() == [str(slurm.MAX_LOG_CHUNK).encode(), str(slurm.MAX_LOG_CHUNK + 10).encode()]
+    assert len(data) == slurm.MAX_LOG_CHUNK
+
+
+def test_logs_rejects_unknown_stream() -> None:
+    result = CliRunner().invoke(slurm.app, ["logs", "12", "--stream", "foo"])
+    assert result.exit_code == 2
+    assert "is not one of out, err, both" in result.output
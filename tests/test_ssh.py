@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+import secrets
+from typing import TYPE_CHECKING
+
+from jz_cli import ssh
+from jz_cli.slurm import _upload_commands
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def test_run_batch_uploads_large_files_over_stdin(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_ssh = tmp_path / "ssh"
+    fake_ssh.write_text('#!/bin/sh\nshift\nexec sh -c "$1"\n')
+    fake_ssh.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    monkeypatch.setattr(ssh, "start_master_connection", lambda: None)
+    monkeypatch.setattr(ssh, "session_enabled", lambda: False)
+    monkeypatch.setattr(ssh, "get_ssh_opts", lambda: "")
+    monkeypatch.setattr(ssh, "get_remote_user", lambda: "user@host")
+
+    # Random text barely compresses: well over the 128 KiB limit of a single argument once encoded
+    files = {tmp_path / "big.txt": secrets.token_hex(200_000), tmp_path / "small.txt": "echo hello\n"}
+    cmds, payload = _upload_commands(files)
+    assert len(payload) > 128 * 1024
+    assert all(len(cmd) < 1024 for cmd in cmds)
+
+    results = ssh.run_batch([*cmds, "cat"], stop_on_failure=True, input=payload)
+    assert [result.returncode for result in results] == [0, 0, 0]
+    # Commands other than the uploads do not see the input
+    assert results[-1].stdout == ""
+    for path, content in files.items():
+        assert path.read_text() == content
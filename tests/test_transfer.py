@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import shlex
+import subprocess
+from pathlib import Path
+
+import pytest
+import typer
+
+from jz_cli import transfer
+from jz_cli.transfer import TransferProfile, get_profile, parse_compress
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("none", TransferProfile("none")),
+        ("zlib:9", TransferProfile("zlib", 9)),
+        ("zstd:-5", TransferProfile("zstd", -5)),
+        ("lz4", TransferProfile("lz4")),
+    ],
+)
+def test_parse_compress(value: str, expected: TransferProfile) -> None:
+    assert parse_compress(value) == expected
+
+
+@pytest.mark.parametrize("value", ["zstd:x", "zlib:10", "lz4:1", "auto:3", "brotli", "zstd:"])
+def test_parse_compress_rejects(value: str) -> None:
+    with pytest.raises(typer.BadParameter):
+        parse_compress(value)
+
+
+def test_get_profile_checks_both_rsyncs(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(transfer, "common_compressors", lambda: ["zstd", "zlib"])
+    assert get_profile("host", "zstd:3") == (TransferProfile("zstd", 3), True)
+    with pytest.raises(typer.BadParameter):
+        get_profile("host", "lz4")
+
+    # rsync < 3.2 on one end: zlib only, without --compress-choice
+    monkeypatch.setattr(transfer, "common_compressors", list)
+    assert get_profile("host", "zlib") == (TransferProfile("zlib"), False)
+    with pytest.raises(typer.BadParameter):
+        get_profile("host", "zstd")
+
+
+def test_measure_profiles_quotes_the_scratch_directory(monkeypatch: pytest.MonkeyPatch) -> None:
+    removed = []
+    monkeypatch.setattr(transfer, "common_compressors", list)
+    monkeypatch.setattr(transfer.subprocess, "run", lambda *_, **__: subprocess.CompletedProcess([], 0))
+    monkeypatch.setattr(transfer, "run", removed.append)
+    transfer.measure_profiles(["rsync"], ["a"], "src/", "host", Path("/gpfswork/x/my proj"))
+    assert len(removed) == 1
+    (path,) = shlex.split(removed[0])[2:]
+    assert path.startswith("/gpfswork/x/my proj/.jz-tune-")